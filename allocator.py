@@ -0,0 +1,293 @@
+"""
+テスト割り当てエンジン
+・担当者ごとの「start以降で残り時間がN以上の最初の月」を台帳（hours_ledger.HoursLedger）のセグメント木で検索
+・月ごとのテスト可能台数も同じくセグメント木で管理
+・両方の条件を満たす月を交互に飛び越えながら探すので、1件あたりO(log 月数)程度で決まる
+"""
+
+import numpy as np
+import pandas as pd
+
+from hours_ledger import HoursLedger, month_label
+
+
+class MaxTree:
+    """区間最大値のセグメント木。値の更新と「start以降でthreshold以上の最初の位置」の検索を行う。"""
+
+    def __init__(self, values):
+        self.n = len(values)
+        size = 1
+        while size < max(self.n, 1):
+            size *= 2
+        self.size = size
+        self.tree = [float('-inf')] * (2 * size)
+        for i, v in enumerate(values):
+            self.tree[size + i] = v
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def get(self, i):
+        return self.tree[self.size + i]
+
+    def copy(self):
+        clone = object.__new__(MaxTree)
+        clone.n = self.n
+        clone.size = self.size
+        clone.tree = self.tree[:]
+        return clone
+
+    def set(self, i, value):
+        node = self.size + i
+        self.tree[node] = value
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def add(self, i, delta):
+        self.set(i, self.get(i) + delta)
+
+    def find_first(self, start, threshold):
+        # start以降で値がthreshold以上となる最初の位置（無ければ-1）
+        if start >= self.n or self.tree[1] < threshold:
+            return -1
+        return self._find(1, 0, self.size - 1, max(start, 0), threshold)
+
+    def _find(self, node, lo, hi, start, threshold):
+        if hi < start or self.tree[node] < threshold:
+            return -1
+        if lo == hi:
+            return lo if lo < self.n else -1
+        mid = (lo + hi) // 2
+        found = self._find(2 * node, lo, mid, start, threshold)
+        if found != -1:
+            return found
+        return self._find(2 * node + 1, mid + 1, hi, start, threshold)
+
+
+class CapacityAllocator:
+    """
+    担当者の労働可能時間と月ごとのテスト可能台数を管理し、first-fitで月を割り当てる。
+    months: 対象期間の月ラベル（'YYYY-MM'）のリスト
+    hours: HoursLedger（months と同じ月）、または {担当者: {月: 時間}} の辞書
+    capacity: {月: テスト可能台数}
+    """
+
+    def __init__(self, months, hours, capacity):
+        self.months = list(months)
+        self.month_pos = {m: i for i, m in enumerate(self.months)}
+        # データが無い月は0時間・0台として扱う
+        if not isinstance(hours, HoursLedger):
+            hours = HoursLedger.from_dict(hours, self.months)
+        elif hours.months != self.months:
+            raise ValueError("労働可能時間の台帳の月が割り当ての対象期間と一致しません。")
+        self.ledger = hours
+        capacity = {month_label(m): c for m, c in capacity.items()}
+        self.capacity = MaxTree([_to_number(capacity.get(m, 0)) for m in self.months])
+
+    @classmethod
+    def from_frames(cls, available_hours, monthly_capacity, months, month_column='月'):
+        hours = HoursLedger.from_frame(available_hours, months)
+        capacity = monthly_capacity.set_index(month_column)['テスト可能台数'].to_dict()
+        return cls(months, hours, capacity)
+
+    def has_person(self, person):
+        return self.ledger.has_person(person)
+
+    def has_month(self, month):
+        return month in self.month_pos
+
+    def available_hours(self, person, month):
+        return self.ledger.get(person, month)
+
+    def remaining_capacity(self, month):
+        return self.capacity.get(self.month_pos[month])
+
+    def can_place(self, person, month, hours_needed):
+        if not self.ledger.has_person(person) or month not in self.month_pos:
+            return False
+        return self.ledger.get(person, month) >= hours_needed and self.capacity.get(self.month_pos[month]) > 0
+
+    def reserve(self, person, month, hours_needed):
+        i = self.month_pos[month]
+        self.ledger.add(person, i, -hours_needed)
+        self.capacity.add(i, -1)
+
+    def copy(self):
+        # シナリオごとに使い回すための複製（木の配列だけをコピー）
+        clone = object.__new__(CapacityAllocator)
+        clone.months = self.months
+        clone.month_pos = self.month_pos
+        clone.ledger = self.ledger.copy()
+        clone.capacity = self.capacity.copy()
+        return clone
+
+    def release(self, person, month, hours_needed):
+        i = self.month_pos[month]
+        self.ledger.add(person, i, hours_needed)
+        self.capacity.add(i, 1)
+
+    def find_month(self, person, start_month, hours_needed):
+        # start_month以降で、担当者の時間と月の台数の両方に空きがある最初の月（無ければNone）
+        if not self.ledger.has_person(person):
+            return None
+        i = self._start_index(start_month)
+        while i != -1:
+            i = self.ledger.find_first(person, i, hours_needed)
+            if i == -1:
+                return None
+            j = self.capacity.find_first(i, 1)
+            if j == i:
+                return self.months[i]
+            i = j
+        return None
+
+    def assign(self, person, start_month, hours_needed):
+        month = self.find_month(person, start_month, hours_needed)
+        if month is not None:
+            self.reserve(person, month, hours_needed)
+        return month
+
+    def _start_index(self, start_month):
+        if start_month in self.month_pos:
+            return self.month_pos[start_month]
+        # 期間外の月は前なら先頭から、後ろなら割り当て不可
+        if self.months and start_month < self.months[0]:
+            return 0
+        return -1
+
+
+class ScheduleBuffer:
+    """
+    割り当て結果（月・エリア・担当者・図面装置No・設備）を割り当てた順に貯めておき、出力時にまとめて表にする。
+    セルごとに文字列を継ぎ足す代わりに使う。*_column は devices から取る列名（None ならその項目は空欄）。
+    """
+
+    FIELDS = ('月', 'エリア', '担当者', '図面装置No', '設備')
+
+    def __init__(self, area_column='エリア', person_column='オンラインテスト担当者', drawing_column='図面装置No',
+                 device_column='設備'):
+        self.source_columns = dict(zip(self.FIELDS[1:], (area_column, person_column, drawing_column, device_column)))
+        self.columns = {field: [] for field in self.FIELDS}
+
+    def __len__(self):
+        return len(self.columns['月'])
+
+    def add(self, month, area, person, drawing_no=None, device=None):
+        for field, value in zip(self.FIELDS, (month, area, person, drawing_no, device)):
+            self.columns[field].append(value)
+
+    def add_devices(self, devices, assigned):
+        """devices の各行と割り当て月 assigned（同じ並び、None は未割り当て）をまとめて追加する。"""
+        assigned = np.asarray(assigned, dtype=object)
+        mask = pd.notna(assigned)
+        self.columns['月'].extend(assigned[mask].tolist())
+        for field, column in self.source_columns.items():
+            if column is None:
+                self.columns[field].extend([None] * int(mask.sum()))
+            else:
+                self.columns[field].extend(devices[column].to_numpy()[mask].tolist())
+
+    def to_frame(self):
+        """縦持ちの表（1行1台）。"""
+        return pd.DataFrame(self.columns, columns=list(self.FIELDS))
+
+    def render(self, months, areas, entry_format='({担当者}) {エリア} No.{図面装置No} {設備}'):
+        """
+        エリア × 月の表（同じセルの装置は割り当てた順に改行でつなぐ、空きは''）。
+        areas に無いエリアの装置は、最初に出てきた順で最後の行に追加する。
+        """
+        df = self.to_frame()
+        df['entry'] = [entry_format.format(**record) for record in df[list(self.FIELDS)].to_dict('records')]
+        cells = df.groupby(['エリア', '月'], sort=False)['entry'].agg('\n'.join).unstack()
+        areas = list(areas)
+        rows = areas + [a for a in cells.index if a not in areas]
+        grid = cells.reindex(index=rows, columns=list(months)).fillna('')
+        return grid.rename_axis(index=None, columns=None)
+
+
+def allocate_devices(devices, allocator, test_hours_needed=40, fixed_column='受け入れテスト実施日',
+                     release_column='リリース予定日', person_column='オンラインテスト担当者', log=print, buffer=None,
+                     workers=None):
+    """
+    改定版.py の割り当て手順。devices は優先順位順に並べておく。
+    1) fixed_column に日付がある装置はその月で確定（空きが無ければ log に出して割り当てない）
+    2) 残りの装置は release_column の月以降で、担当者の時間と月の台数に空きがある最初の月
+    戻り値は devices.index に対応する割り当て月（割り当てられなければNone）のSeries。
+    buffer（ScheduleBuffer）を渡すと、割り当てた装置を割り当てた順（1 → 2）に追加する。
+    workers を指定すると、互いに影響しない装置のまとまりごとに並列に割り当てる（結果は同じ。parallel_allocation を参照）。
+    """
+    persons = devices[person_column].to_numpy()
+    release_months = _month_labels_of(devices[release_column])
+    if fixed_column is not None and fixed_column in devices.columns:
+        fixed_months = _month_labels_of(devices[fixed_column])
+    else:
+        fixed_months = [None] * len(devices)
+    if workers is not None and workers != 1:
+        from parallel_allocation import assign_months_parallel
+        assigned = assign_months_parallel(persons, fixed_months, release_months, allocator, test_hours_needed, log,
+                                          workers)
+    else:
+        assigned = assign_months(persons, fixed_months, release_months, allocator, test_hours_needed, log)
+    assigned = pd.Series(assigned, index=devices.index, dtype=object)
+    if buffer is not None:
+        order = placement_order(fixed_months)
+        buffer.add_devices(devices.iloc[order], assigned.iloc[order])
+    return assigned
+
+
+def assign_months(persons, fixed_months, release_months, allocator, test_hours_needed=40, log=print):
+    """allocate_devices の本体。月は'YYYY-MM'の文字列（無ければNone）で受け取り、割り当て月のリストを返す。"""
+    assigned = [None] * len(persons)
+    log = log or _no_log
+    # '受け入れテスト実施日'が存在する設備を最優先で処理し、残りの設備を通常通り割り当て
+    for i in placement_order(fixed_months):
+        assigned[i] = place_device(allocator, persons[i], fixed_months[i], release_months[i], test_hours_needed, log)
+    return assigned
+
+
+def placement_order(fixed_months):
+    """割り当てる順番（確定月がある装置 → 残りの装置、それぞれ元の並び順）の位置のリスト。"""
+    return sorted(range(len(fixed_months)), key=lambda i: fixed_months[i] is None)
+
+
+def place_device(allocator, incharge, fixed_month, start_month, test_hours_needed=40, log=print):
+    """1台分の割り当て。fixed_month があればその月で確定、無ければ start_month 以降の最初の空き月（割り当て月かNone）。"""
+    log = log or _no_log
+    if fixed_month is not None:
+        if not allocator.has_person(incharge):
+            log(f"担当者 {incharge} の利用可能時間のデータがありません。")
+            return None
+        if not allocator.has_month(fixed_month):
+            log(f"担当者 {incharge} の利用可能時間に月 {fixed_month} がありません。")
+            return None
+        if allocator.can_place(incharge, fixed_month, test_hours_needed):
+            allocator.reserve(incharge, fixed_month, test_hours_needed)
+            return fixed_month
+        log(f"担当者 {incharge} の月 {fixed_month} の利用可能時間または月のテスト可能台数が不足しています。")
+        return None
+    if start_month is None:
+        log(f"担当者 {incharge} の設備はリリース予定日が無いため割り当てできません。")
+        return None
+    return allocator.assign(incharge, start_month, test_hours_needed)
+
+
+def month_labels(start, end):
+    # startからendまでの月ラベル（'YYYY-MM'）
+    return pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M').strftime('%Y-%m').tolist()
+
+
+def _month_labels_of(values):
+    # strftime より速い datetime_as_string で'YYYY-MM'にする（NaTはNone）
+    months = pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[M]')
+    return [None if m == 'NaT' else m for m in np.datetime_as_string(months, unit='M').tolist()]
+
+
+def _no_log(message):
+    pass
+
+
+def _to_number(value):
+    if pd.isna(value):
+        return 0
+    return value
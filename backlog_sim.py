@@ -0,0 +1,106 @@
+"""
+優先度順バックログのシミュレーション（15test.py の月次ループの置き換え）
+・累計 → 増分は diff で一括計算
+・増分が入る月から次に増分が入る月までは新規の追加が無いので、その区間のテスト台数を式で一括計算
+  （区間内の累計テスト台数 = min(残数合計, 経過月数 × 月の上限) を優先度順に割り振る）
+・最後の増分以降も残数が0になる月数を割り算で求めるので、月ごとのループは無い
+・増分が負の場合や月の上限が0の場合は、終わらないループにならないよう例外にする
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def cumulative_to_increments(df_cumulative, columns, date_column='Date'):
+    """累計の表を日付順に並べ、各列を前の行との差分（初月は累計値そのまま）に変換する。"""
+    df = df_cumulative.copy()
+    df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
+    df = df.dropna(subset=[date_column]).sort_values(date_column).reset_index(drop=True)
+    # 累計が空欄の月は前月から変化なしとみなす
+    cumulative = df[columns].apply(pd.to_numeric, errors='coerce').ffill().fillna(0)
+    df[columns] = cumulative.diff().fillna(cumulative)
+    return df
+
+
+def simulate_backlog(df_cumulative, priority_order, max_per_month=3, date_column='Date', negative='error',
+                     max_months=1200):
+    """
+    累計の表から、毎月 priority_order の順に最大 max_per_month 台ずつテストした結果を返す。
+    列は Month, Tested_<工程>, Backlog_<工程>（15test.py と同じ）。
+    negative: 増分が負の行の扱い。'error' なら ValueError、'clip' ならその月の残数を0未満にしない
+    max_months: シミュレーションする月数の上限（超える場合は RuntimeError）
+    """
+    if negative not in ('error', 'clip'):
+        raise ValueError(f"negative は 'error' か 'clip' を指定してください: {negative!r}")
+    priority_order = list(priority_order)
+    df_diff = cumulative_to_increments(df_cumulative, priority_order, date_column)
+    if df_diff.empty:
+        return _result_frame([], np.zeros((0, len(priority_order))), np.zeros((0, len(priority_order))), priority_order)
+
+    increments = df_diff[priority_order].to_numpy(dtype='int64')
+    if negative == 'error' and (increments < 0).any():
+        rows = df_diff.loc[(increments < 0).any(axis=1), date_column].dt.strftime('%Y-%m-%d').tolist()
+        raise ValueError(f"累計が前月より減っている月があります: {rows}")
+
+    # 同じ月の増分はまとめる
+    months = df_diff[date_column].to_numpy(dtype='datetime64[M]')
+    arrival_months, inverse = np.unique(months, return_inverse=True)
+    arrivals = np.zeros((len(arrival_months), len(priority_order)), dtype='int64')
+    np.add.at(arrivals, inverse, increments)
+
+    tested_blocks = []
+    backlog_blocks = []
+    backlog = np.zeros(len(priority_order), dtype='int64')
+    total_months = 0
+    for i, month in enumerate(arrival_months):
+        backlog = backlog + arrivals[i]
+        if negative == 'clip':
+            backlog = np.maximum(backlog, 0)
+
+        if i + 1 < len(arrival_months):
+            # 次の増分までの月数（残数が0になった後の月はテスト0台の行になる）
+            n_months = int((arrival_months[i + 1] - month).astype('int64'))
+        else:
+            remaining = int(backlog.sum())
+            if remaining > 0 and max_per_month <= 0:
+                raise ValueError("max_per_month が0以下のため、残りの装置のテストが終わりません。")
+            n_months = max(1, -(-remaining // max_per_month)) if remaining > 0 else 1
+
+        total_months += n_months
+        if total_months > max_months:
+            raise RuntimeError(f"シミュレーションが {max_months} か月を超えました。入力データを確認してください。")
+
+        tested, backlog_by_month = drain_backlog(backlog, max_per_month, n_months)
+        tested_blocks.append(tested)
+        backlog_blocks.append(backlog_by_month)
+        backlog = backlog_by_month[-1]
+
+    tested = np.vstack(tested_blocks)
+    backlog_by_month = np.vstack(backlog_blocks)
+    month_index = np.arange(len(tested)) + arrival_months[0]
+    return _result_frame(month_index, tested, backlog_by_month, priority_order)
+
+
+def drain_backlog(backlog, max_per_month, n_months):
+    """
+    新規の追加が無い n_months か月の間、毎月 max_per_month 台を優先度順にテストする。
+    戻り値は (各月のテスト台数, 各月末の残数)。どちらも n_months × 工程数 の配列。
+    """
+    backlog = np.asarray(backlog, dtype='int64')
+    positive = np.maximum(backlog, 0)
+    # 各工程より優先度の高い工程の残数合計
+    before = np.cumsum(positive) - positive
+    # 各月末までのテスト台数の合計
+    done = np.minimum(positive.sum(), np.arange(1, n_months + 1) * max(max_per_month, 0))
+    cumulative = np.clip(done[:, None] - before[None, :], 0, positive[None, :])
+    tested = np.diff(cumulative, axis=0, prepend=np.zeros((1, len(backlog)), dtype='int64'))
+    return tested, backlog[None, :] - cumulative
+
+
+def _result_frame(month_index, tested, backlog, priority_order):
+    result = {'Month': pd.to_datetime(np.asarray(month_index, dtype='datetime64[M]')).strftime('%Y-%m-%d')}
+    for j, p in enumerate(priority_order):
+        result[f'Tested_{p}'] = tested[:, j]
+    for j, p in enumerate(priority_order):
+        result[f'Backlog_{p}'] = backlog[:, j]
+    return pd.DataFrame(result)
@@ -0,0 +1,156 @@
+"""
+処理段階ごとのベンチマーク
+・synth_data.py の合成データで、読み込み / 日付の検証 / 優先順位の抽出 / 割り当て / ピボット / 出力 の時間を測る
+・行数を変えて実行し、結果を JSON に保存する（変更前後の比較用）
+
+使い方:
+    python bench.py --rows 1000 10000 100000 --repeat 3 --output bench_results.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from allocator import allocate_devices, month_labels
+from date_utils import normalize_date_columns
+from devices import DATE_COLUMNS, DEVICE_COLUMNS, load_allocator, load_devices, prepare_devices
+from input_cache import clear_cache, read_schedule
+from month_rules import adjusted_test_month
+from pivot_builder import build_schedule_pivot
+from synth_data import write_inputs
+
+STAGES = ['読み込み', '読み込み（キャッシュ）', '日付の検証', '優先順位の抽出', '割り当て', 'ピボット', '出力']
+SCHEDULE_COLUMNS = ['工程', '機種名', 'リリース予定日', '初号機テスト実施時期', '受入テスト実施日']
+
+
+def run_benchmark(n_rows, repeat=3, start='2024-10-01', end='2026-03-31', xlsx=False, seed=0):
+    """n_rows 行の合成データで各段階を repeat 回実行し、段階ごとの結果（最小・中央値の秒数など）を返す。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(Path(tmp) / 'input', n_rows, xlsx=xlsx, start=start, end=end, seed=seed)
+        output_dir = Path(tmp) / 'output'
+        output_dir.mkdir()
+        months = month_labels(start, end)
+        state = {}
+
+        def load():
+            clear_cache(paths['管理表'])
+            state['raw'] = _read_raw(paths['管理表'])
+            return state['raw']
+
+        def load_cached():
+            df, _ = load_devices(paths['管理表'])
+            return df
+
+        def validate():
+            df = state['raw'].copy()
+            normalize_date_columns(df, DATE_COLUMNS, report=False)
+            state['devices'] = df
+            return df
+
+        def priority():
+            state['prepared'] = prepare_devices(state['devices'])
+            return state['prepared']
+
+        def allocate():
+            allocator = state['allocator'].copy()
+            state['assigned'] = allocate_devices(state['prepared'], allocator, log=None)
+            return state['assigned']
+
+        def pivot():
+            df = state['schedule'].copy()
+            df['調整後テスト実施時期'] = adjusted_test_month(df, 'expand_machine')
+            state['pivot'] = build_schedule_pivot(
+                df, '調整後テスト実施時期', start, end,
+                undecided=state['schedule_dates']['リリース予定日'].sentinels_in(df),
+            )
+            return state['pivot']
+
+        def export():
+            state['pivot'].to_csv(output_dir / 'pivot.csv', encoding='utf-8-sig')
+            result = state['prepared'].assign(割り当て月=state['assigned'])
+            result.to_csv(output_dir / 'assigned.csv', index=False, encoding='utf-8-sig')
+            return result
+
+        # 割り当てとピボットの入力は計測対象外で先に用意する
+        state['allocator'] = load_allocator(paths['労働可能時間'], paths['月ごとのテスト可能台数'], months)
+        state['schedule'], state['schedule_dates'] = read_schedule(
+            paths['装置搬入スケジュール'], columns=SCHEDULE_COLUMNS,
+            date_columns=['リリース予定日', '初号機テスト実施時期'], use_cache=False, report=False,
+        )
+        load_devices(paths['管理表'])
+
+        steps = [load, load_cached, validate, priority, allocate, pivot, export]
+        results = []
+        for stage, step in zip(STAGES, steps):
+            if stage == '読み込み（キャッシュ）':
+                # load でキャッシュを消しているので作り直す
+                load_devices(paths['管理表'])
+            seconds = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                out = step()
+                seconds.append(time.perf_counter() - t0)
+            results.append({
+                'rows': n_rows,
+                'stage': stage,
+                'repeat': repeat,
+                'min_seconds': min(seconds),
+                'median_seconds': float(np.median(seconds)),
+                'rows_out': len(out),
+            })
+        return results
+
+
+def _read_raw(path):
+    if str(path).lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        return pd.read_excel(path, sheet_name='管理表', usecols=DEVICE_COLUMNS)
+    return pd.read_csv(path, usecols=DEVICE_COLUMNS)
+
+
+def environment():
+    """結果の比較に必要な実行環境の情報。"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='処理段階ごとのベンチマーク')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--xlsx', action='store_true', help='管理表を xlsx で読み込む')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        for result in run_benchmark(n_rows, repeat=args.repeat, xlsx=args.xlsx, seed=args.seed):
+            print(f"{result['rows']:>8} 行  {result['stage']:<12} {result['min_seconds']:.4f} 秒")
+            results.append(result)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"ベンチマーク結果が保存されました: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
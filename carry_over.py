@@ -0,0 +1,82 @@
+"""
+月ごとのテスト台数と繰越台数の計算（testmachine.py / tesutoruikei.py）
+・繰越 c[i] = max(0, c[i-1] + Testable[i] - TestLimit[i]) は、S = cumsum(Testable - TestLimit) を使うと
+  c[i] = S[i] - min(0, S[0..i]の最小値) となるので、月ごとのループ無しで一括計算できる
+・最後に残った繰越を消化する追加の月数は割り算（上限が月ごとに違う場合は累積和の検索）で求める
+・追加の月にも「YYYY-MM」の月ラベルを付ける
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def carry_over(testable, test_limit):
+    """各月のテスト台数と月末の繰越台数を返す。test_limit はスカラーでも月ごとの配列でもよい。"""
+    testable = np.asarray(testable, dtype='int64')
+    test_limit = np.broadcast_to(np.asarray(test_limit, dtype='int64'), testable.shape)
+    s = np.cumsum(testable - test_limit)
+    carry = s - np.minimum(np.minimum.accumulate(s), 0) if len(s) else s
+    previous = np.concatenate([[0], carry[:-1]])
+    tested = testable + previous - carry
+    return tested, carry
+
+
+def drain_months(carry, extra_limit=3):
+    """
+    残った繰越 carry を消化する追加の月の (TestLimit, Tested, CarryOver) を返す。
+    extra_limit はスカラー（毎月同じ上限）か、追加の月ごとの上限の配列。
+    """
+    carry = int(carry)
+    if carry <= 0:
+        empty = np.zeros(0, dtype='int64')
+        return empty, empty, empty
+    if np.ndim(extra_limit) == 0:
+        if extra_limit <= 0:
+            raise ValueError("追加の月のテスト上限が0以下のため、繰越が消化できません。")
+        n_months = -(-carry // int(extra_limit))
+        limits = np.full(n_months, int(extra_limit), dtype='int64')
+    else:
+        limits = np.asarray(extra_limit, dtype='int64')
+        n_months = int(np.searchsorted(np.cumsum(limits), carry)) + 1
+        if n_months > len(limits):
+            raise ValueError(f"追加の月のテスト上限の合計が繰越 {carry} 台に足りません。")
+        limits = limits[:n_months]
+    done = np.minimum(np.cumsum(limits), carry)
+    tested = np.diff(done, prepend=0)
+    return limits, tested, carry - done
+
+
+def carry_over_table(data, test_limit=None, extra_limit=3):
+    """
+    Month, Testable（と TestLimit）列の表から、Tested と CarryOver を計算し、
+    繰越が無くなるまで月を追加した表を返す。test_limit を指定した場合は TestLimit 列の代わりに使う。
+    """
+    data = data.reset_index(drop=True)
+    if test_limit is None:
+        test_limit = data['TestLimit'].to_numpy()
+    tested, carry = carry_over(data['Testable'].to_numpy(), test_limit)
+
+    result = data.copy()
+    result['Tested'] = tested
+    result['CarryOver'] = carry
+
+    limits, extra_tested, extra_carry = drain_months(carry[-1] if len(carry) else 0, extra_limit)
+    if len(limits) == 0:
+        return result
+    extra = pd.DataFrame({
+        'Month': following_months(data['Month'], len(limits)),
+        'Testable': 0,
+        'Tested': extra_tested,
+        'CarryOver': extra_carry,
+    })
+    if 'TestLimit' in result.columns:
+        extra.insert(2, 'TestLimit', limits)
+    return pd.concat([result, extra[[c for c in result.columns if c in extra.columns]]], ignore_index=True)
+
+
+def following_months(months, n):
+    """月ラベルの最後の月に続く n か月分の「YYYY-MM」ラベル（最後の月が読めない場合は Month N）。"""
+    last = pd.to_datetime(pd.Series(months).astype(str), errors='coerce', format='%Y-%m').iloc[-1] if len(months) else pd.NaT
+    if pd.isna(last):
+        return [f"Month {len(months) + k}" for k in range(1, n + 1)]
+    return pd.period_range(last.to_period('M') + 1, periods=n, freq='M').strftime('%Y-%m').tolist()
@@ -0,0 +1,129 @@
+"""
+日付列の一括正規化
+・列全体を1回のpd.to_datetimeで変換（ISO形式を優先し、失敗したセルだけ形式推定で再変換）
+・'搬入日未定'などの予約語は同じ処理の中で別区分に分類
+・変換できなかったセルは行番号付きで報告（元のファイルの行が分からない場合は DataFrame のインデックス）
+"""
+
+import numpy as np
+import pandas as pd
+
+# 日付の代わりに入力される予約語
+DATE_SENTINELS = ('搬入日未定',)
+
+# 区分
+STATUS_OK = '日付'
+STATUS_MISSING = '空欄'
+STATUS_SENTINEL = '未定'
+STATUS_INVALID = '不正'
+DATE_STATUSES = [STATUS_OK, STATUS_MISSING, STATUS_SENTINEL, STATUS_INVALID]
+
+
+class NormalizedDates:
+    """
+    normalize_dates の結果
+    dates: datetime64の列（日付以外はNaT、defaultを指定した場合は未定・不正のセルをdefaultで埋める）
+    status: 各セルの区分（日付/空欄/未定/不正）のカテゴリ列
+    line_offset: インデックスに足すと元のファイルの行番号になる数（read_schedule で読んだ場合）。
+                 None なら報告にはインデックスをそのまま使う
+    """
+
+    def __init__(self, name, raw, dates, status, line_offset=None):
+        self.name = name
+        self.raw = raw
+        self.dates = dates
+        self.status = status
+        self.line_offset = line_offset
+
+    @property
+    def sentinel_mask(self):
+        return (self.status == STATUS_SENTINEL).to_numpy()
+
+    def sentinels_in(self, frame):
+        # 絞り込み後の frame の行に合わせた未定フラグ
+        return (self.status.reindex(frame.index) == STATUS_SENTINEL).to_numpy()
+
+    @property
+    def invalid_mask(self):
+        return (self.status == STATUS_INVALID).to_numpy()
+
+    def invalid_rows(self):
+        # 変換できなかったセル（元のファイルの行番号（分からなければインデックス）・列名・元の値）
+        mask = self.invalid_mask
+        if self.line_offset is None:
+            position = {'インデックス': self.raw.index[mask]}
+        else:
+            position = {'行番号': self.raw.index[mask] + self.line_offset}
+        return pd.DataFrame({
+            **position,
+            '列': self.name,
+            '値': self.raw.to_numpy()[mask],
+        })
+
+    def report(self):
+        # 変換できなかったセルを表示
+        invalid = self.invalid_rows()
+        if invalid.empty:
+            return
+        print(f"{self.name} に日付として読めない値が {len(invalid)} 件あります。")
+        label, column = ('インデックス', 'インデックス') if self.line_offset is None else ('行', '行番号')
+        for position, value in zip(invalid[column], invalid['値']):
+            print(f"  {label} {position}: {value!r}")
+
+
+def normalize_dates(values, sentinels=DATE_SENTINELS, default=None, name=None, line_offset=None):
+    """
+    列全体を1回で日付に変換し、各セルを日付/空欄/未定/不正に分類する。
+    line_offset: インデックスから元のファイルの行番号への差（NormalizedDates を参照）
+    """
+    values = pd.Series(values)
+    name = values.name if name is None else name
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        dates = values
+        status = np.where(values.isna(), STATUS_MISSING, STATUS_OK)
+    else:
+        text = values.astype('string').str.strip()
+        missing = (values.isna() | (text == '')).to_numpy()
+        sentinel = text.isin(sentinels).fillna(False).to_numpy(dtype=bool) & ~missing
+
+        candidates = values.where(~(missing | sentinel))
+        dates = pd.to_datetime(candidates, errors='coerce', format='ISO8601')
+        # ISO形式で読めなかったセルだけ形式を推定して再変換
+        retry = dates.isna().to_numpy() & ~missing & ~sentinel
+        if retry.any():
+            dates[retry] = pd.to_datetime(candidates[retry].astype(str), errors='coerce', format='mixed')
+
+        invalid = dates.isna().to_numpy() & ~missing & ~sentinel
+        status = np.select([missing, sentinel, invalid], [STATUS_MISSING, STATUS_SENTINEL, STATUS_INVALID], STATUS_OK)
+
+    status = pd.Series(pd.Categorical(status, categories=DATE_STATUSES), index=values.index, name=name)
+    if default is not None:
+        fill = status.isin([STATUS_SENTINEL, STATUS_INVALID])
+        dates = dates.mask(fill, pd.Timestamp(default))
+    return NormalizedDates(name, values, dates.rename(name), status, line_offset)
+
+
+def normalize_date_columns(df, columns, sentinels=DATE_SENTINELS, default=None, report=True):
+    """
+    複数の日付列をまとめて正規化し、dfの列を置き換える。
+    戻り値は {列名: NormalizedDates}。元の文字列での判定（未定など）はこちらを使う。
+    """
+    results = {}
+    for column in columns:
+        result = normalize_dates(df[column], sentinels=sentinels, default=default, name=column)
+        df[column] = result.dates
+        if report:
+            result.report()
+        results[column] = result
+    return results
+
+
+def to_month(values):
+    """日付列を月単位のdatetime64[M]配列（整数の月序数）に変換する。NaTはそのまま。"""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[M]')
+
+
+def month_start(months, index=None, name=None):
+    """datetime64[M]配列を月初日のTimestamp列に戻す。"""
+    return pd.Series(np.asarray(months, dtype='datetime64[M]').astype('datetime64[ns]'), index=index, name=name)
@@ -0,0 +1,159 @@
+"""
+初号機 → 増設機の依存関係を考慮して、1回の割り当てで両方を決める
+（20241207_expand_machine.py のように初号機の計画を確定してから増設機を別に割り当てると、
+  初号機で埋まった月を増設機が二重に予約してしまう）
+・管理表の 装置型式毎の初回テスト対象 が 〇（1号機）の装置を初号機、増設機 の装置を増設機とし、
+  同じ設備の初号機 → 増設機 の依存関係（lag か月後以降）を作る。どちらの印も無い装置は割り当てない
+・全装置を同じ労働可能時間の台帳・月ごとのテスト可能台数に対して、依存関係の順（トポロジカル順）に1台ずつ割り当てる
+  1) 受け入れテスト実施日がある装置はその月で確定（改定版.py と同じ）
+  2) 依存元の無い装置（初号機など）を最終優先順位・リリース予定日の順に、リリース月以降の最初の空き月
+  3) 増設機を同じ順に、リリース月と「初号機の割り当て月 + lag」の遅い方以降の最初の空き月
+     （初号機が期間内に割り当てられない場合や、同じ設備の初号機が割り当ての対象に無い場合は、増設機も割り当てない）
+・月単位で比較するので、リリース日と初号機のテスト日が同じ月の場合も初号機の翌月以降になる
+
+使い方:
+    python dependency_schedule.py [管理表] [労働可能時間] [テスト可能台数] [--lag 1]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from allocator import ScheduleBuffer, _month_labels_of, _no_log, month_labels, place_device
+from devices import FIRST_UNIT_MARK, PROCESS_PRIORITY, load_allocator, load_devices, prepare_devices
+from profiler import add_profile_arguments, profiler_from_args
+
+# 同じ設備の初号機が devices に無い増設機の依存元
+MISSING_FIRST_UNIT = -2
+
+
+def first_unit_predecessors(devices, model_column='設備', unit_column='号機', marker_column='装置型式毎の初回テスト対象'):
+    """
+    装置ごとの依存元（同じ設備の初号機）の位置の配列。
+    初号機（marker_column が 〇）と設備が空欄の装置は -1、同じ設備の初号機が devices に無い増設機は MISSING_FIRST_UNIT。
+    同じ設備に初号機が複数あれば、号機が最も小さい装置（同じ号機なら先の行）を依存元にする。
+
+    >>> devices = pd.DataFrame({'設備': ['A', 'A', 'B', None, 'C'], '号機': [1, 2, 3, 5, 1],
+    ...                         '装置型式毎の初回テスト対象': ['〇', '増設機', '増設機', '増設機', '〇']})
+    >>> first_unit_predecessors(devices).tolist()
+    [-1, 0, -2, -1, -1]
+    """
+    units = pd.to_numeric(pd.Series(devices[unit_column].to_numpy(dtype=object)), errors='coerce')
+    frame = pd.DataFrame({'設備': devices[model_column].astype(object).to_numpy(), '号機': units})
+    is_first = (devices[marker_column].astype(object) == FIRST_UNIT_MARK).to_numpy()
+    no_model = frame['設備'].isna().to_numpy()
+    # 設備ごとに、初号機を号機の小さい順（同じなら元の順）で並べた先頭
+    ordered = frame[is_first].sort_values('号機', kind='stable', na_position='last')
+    first = ordered.groupby('設備', sort=False).head(1)
+    first_of = pd.Series(first.index.to_numpy(), index=first['設備'].to_numpy())
+    predecessor = frame['設備'].map(first_of).to_numpy(dtype='float64')
+    predecessor = np.where(np.isnan(predecessor), MISSING_FIRST_UNIT, predecessor).astype('int64')
+    predecessor[is_first | no_model] = -1
+    return predecessor
+
+
+def topological_order(predecessor, fixed_months):
+    """
+    割り当ての順番（位置のリスト）。確定月がある装置 → 依存元の無い装置 → 1段目の依存先 → … の順で、
+    それぞれの中では元の並び順（最終優先順位・リリース予定日の順）。
+    """
+    n = len(predecessor)
+    depth = np.zeros(n, dtype='int64')
+    for i in range(n):
+        # 依存元をたどった段数（循環していれば ValueError）
+        j, steps = predecessor[i], 0
+        if j == MISSING_FIRST_UNIT:
+            # 依存元が無い増設機は割り当てないので、増設機と同じ段にしておく
+            depth[i] = 1
+            continue
+        while j >= 0:
+            steps += 1
+            if steps > n:
+                raise ValueError("装置の依存関係が循環しています。")
+            j = predecessor[j]
+        depth[i] = steps
+    tier = np.where([m is not None for m in fixed_months], -1, depth)
+    return np.lexsort((np.arange(n), tier)).tolist()
+
+
+def schedule_with_dependencies(devices, allocator, test_hours_needed=40, lag=1, fixed_column='受け入れテスト実施日',
+                               release_column='リリース予定日', person_column='オンラインテスト担当者',
+                               model_column='設備', unit_column='号機', log=print, buffer=None):
+    """
+    devices（最終優先順位の順）の初号機・増設機を依存関係の順に allocator へ割り当てる。
+    戻り値は devices.index に対応する割り当て月（割り当てられなければNone）のSeries。
+    buffer（ScheduleBuffer）を渡すと、割り当てた装置を割り当てた順に追加する。
+    """
+    log = log or _no_log
+    persons = devices[person_column].to_numpy()
+    release_months = _month_labels_of(devices[release_column])
+    if fixed_column is not None and fixed_column in devices.columns:
+        fixed_months = _month_labels_of(devices[fixed_column])
+    else:
+        fixed_months = [None] * len(devices)
+    predecessor = first_unit_predecessors(devices, model_column, unit_column)
+    order = topological_order(predecessor, fixed_months)
+
+    assigned = [None] * len(devices)
+    for i in order:
+        start = release_months[i]
+        p = predecessor[i]
+        if fixed_months[i] is None and p == MISSING_FIRST_UNIT:
+            log(f"担当者 {persons[i]} の設備は初号機が割り当ての対象に無いため割り当てできません。")
+            continue
+        if fixed_months[i] is None and p >= 0 and start is not None:
+            if assigned[p] is None:
+                log(f"担当者 {persons[i]} の設備は初号機が割り当てられていないため割り当てできません。")
+                continue
+            start = max(start, _shift_month(assigned[p], lag))
+        assigned[i] = place_device(allocator, persons[i], fixed_months[i], start, test_hours_needed, log)
+
+    assigned = pd.Series(assigned, index=devices.index, dtype=object)
+    if buffer is not None:
+        buffer.add_devices(devices.iloc[order], assigned.iloc[order])
+    return assigned
+
+
+def _shift_month(month, lag):
+    return str(np.datetime64(month, 'M') + lag)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='初号機と増設機を依存関係の順に1回で割り当てる')
+    parser.add_argument('equipment_schedule_path', nargs='?', default='装置アドレス、オンラインテスト管理表.csv')
+    parser.add_argument('available_hours_path', nargs='?', default='労働可能時間.csv')
+    parser.add_argument('monthly_capacity_path', nargs='?', default='月ごとのテスト可能台数.csv')
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2025-10-31')
+    parser.add_argument('--lag', type=int, default=1, help='初号機から増設機までの月数')
+    parser.add_argument('--output', default='test_schedule_with_expansion.csv')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    with profiler.stage('読み込み') as s:
+        equipment_schedule, _ = load_devices(args.equipment_schedule_path)
+        months = month_labels(args.start, args.end)
+        allocator = load_allocator(args.available_hours_path, args.monthly_capacity_path, months)
+        s.output(equipment_schedule)
+    with profiler.stage('絞り込み・優先順位', rows_in=equipment_schedule) as s:
+        devices = s.output(prepare_devices(equipment_schedule, first_only=False))
+    with profiler.stage('割り当て', rows_in=devices) as s:
+        buffer = ScheduleBuffer()
+        assigned = schedule_with_dependencies(devices, allocator, lag=args.lag, buffer=buffer)
+        s.output(assigned.notna().sum())
+    with profiler.stage('出力', rows_in=len(buffer)):
+        buffer.render(months, PROCESS_PRIORITY.keys()).to_csv(args.output)
+        long_path = args.output[:-4] + '_long.csv' if args.output.endswith('.csv') else args.output + '_long.csv'
+        buffer.to_frame().to_csv(long_path, index=False, encoding='utf-8-sig')
+
+    is_first = (devices['装置型式毎の初回テスト対象'].astype(object) == FIRST_UNIT_MARK).to_numpy()
+    for label, mask in (('初号機', is_first), ('増設機', ~is_first)):
+        print(f"{label}: {int(mask.sum())} 台中 {int(assigned[mask].notna().sum())} 台を割り当てました。")
+    print(f"スケジュールがCSVファイルに保存されました: {args.output}, {long_path}")
+    profiler.report()
+
+
+if __name__ == '__main__':
+    main()
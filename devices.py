@@ -0,0 +1,91 @@
+"""
+管理表（装置アドレス、オンラインテスト管理表）の前処理
+・改定版.py と同じ条件で初号機テスト対象の装置を取り出し、最終優先順位の順に並べる
+・シナリオ分析など、改定版.py の割り当てを使い回す処理から共通で使う
+"""
+
+import numpy as np
+import pandas as pd
+
+from allocator import CapacityAllocator
+from input_cache import read_schedule
+
+# 管理表から読み込む列
+DEVICE_COLUMNS = ['エリア', '図面装置No', '設備', '号機', 'オンライン対応', 'オンライン備考', 'リリース予定日',
+                  '装置型式毎の初回テスト対象', 'オンラインテスト担当者', '受け入れテスト実施日']
+DATE_COLUMNS = ['リリース予定日', '受け入れテスト実施日']
+# 値の種類が少なく、カテゴリ型で持つ列
+CATEGORY_COLUMNS = ['エリア', 'オンライン対応', '号機', '装置型式毎の初回テスト対象']
+
+# 装置型式毎の初回テスト対象 の印（初号機・増設機）
+FIRST_UNIT_MARK = '〇'
+EXPANSION_MARK = '増設機'
+
+# 工程の優先順位（改定版.py）
+PROCESS_PRIORITY = {'SubBE': 5, 'EPI': 4, 'WP表': 3, 'WP裏': 2, 'EDS': 1}
+
+# 備考に書かれた特別優先順位（NFKC で正規化した後の文字列に対して使う）
+# 「先行オンライン優先度：N位」「特別優先N位」のどちらも受け付け、数字の後ろに続く文字は無視する
+PRIORITY_PATTERN = r'(?:先行オンライン優先度|特別優先)\s*:?\s*(\d+)'
+
+
+def load_devices(path, sheet_name='管理表', use_cache=True, areas=tuple(PROCESS_PRIORITY)):
+    # 必要な列・有効なエリアの行だけを読み込み、日付列を正規化（前回と同じ内容のファイルならキャッシュを使う）
+    filters = {'エリア': list(areas)} if areas is not None else None
+    return read_schedule(path, sheet_name=sheet_name, columns=DEVICE_COLUMNS, date_columns=DATE_COLUMNS,
+                         use_cache=use_cache, filters=filters, categories=CATEGORY_COLUMNS)
+
+
+def prepare_devices(equipment_schedule, process_priority=PROCESS_PRIORITY, first_only=True):
+    """
+    有効なエリア・オンライン対応・1号機・初回テスト対象で絞り込み、最終優先順位とリリース予定日の順に並べる。
+    first_only=False の場合は、装置型式毎の初回テスト対象 が 増設機 の装置も残す（初号機は first_only と同じ条件）。
+    """
+    df = equipment_schedule[equipment_schedule['エリア'].isin(list(process_priority))]
+    first_unit = (df['号機'] == 1) & (df['装置型式毎の初回テスト対象'] == FIRST_UNIT_MARK)
+    if not first_only:
+        first_unit = first_unit | (df['装置型式毎の初回テスト対象'] == EXPANSION_MARK)
+    df = df[(df['オンライン対応'] == '〇') & first_unit].copy()
+
+    # 特別優先順位と工程優先順位を統合して最終的な優先順位を設定
+    df['最終優先順位'] = final_priority(df['オンライン備考'], df['エリア'], process_priority)
+    return df.sort_values(by=['最終優先順位', 'リリース予定日'], ascending=[True, True])
+
+
+def parse_priority(notes):
+    """備考の列から特別優先順位を一括で取り出す（無ければNaN）。全角の数字・コロンも受け付ける。"""
+    notes = notes if isinstance(notes, pd.Series) else pd.Series(notes, dtype=object)
+    # 備考は同じ文言が多いので、異なる値ごとに1回だけ正規化・抽出して元の行に戻す
+    codes, uniques = pd.factorize(notes.astype('string'))
+    normalized = pd.Series(uniques, dtype='string').str.normalize('NFKC')
+    values = pd.to_numeric(normalized.str.extract(PRIORITY_PATTERN, expand=False), errors='coerce')
+    values = values.to_numpy(dtype='float64', na_value=np.nan)
+    parsed = np.full(len(codes), np.nan)
+    parsed[codes >= 0] = values[codes[codes >= 0]]
+    return pd.Series(parsed, index=notes.index)
+
+
+def final_priority(notes, areas, process_priority=PROCESS_PRIORITY):
+    """特別優先順位があればそれを、無ければ工程の優先順位を最終優先順位（float、どちらも無ければNaN）にする。"""
+    special = parse_priority(notes)
+    areas = areas if isinstance(areas, pd.Series) else pd.Series(areas, index=special.index, dtype=object)
+    # カテゴリ型のエリアは map がカテゴリごとに1回だけ対応表を引く
+    return special.fillna(areas.map(process_priority).astype('float64'))
+
+
+def extract_priority(note):
+    # 1件分の優先順位の数値化（まとめて処理する場合は parse_priority を使う）
+    return parse_priority(pd.Series([note], dtype=object)).iloc[0]
+
+
+def load_allocator(available_hours_path, monthly_capacity_path, months):
+    # 労働可能時間と月ごとのテスト可能台数を読み込んで割り当てエンジンを作る
+    available_hours = _read_table(available_hours_path)
+    monthly_capacity = _read_table(monthly_capacity_path)
+    return CapacityAllocator.from_frames(available_hours, monthly_capacity, months)
+
+
+def _read_table(path):
+    if str(path).lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
@@ -0,0 +1,188 @@
+"""
+担当者 × 月の労働可能時間の台帳
+・労働可能時間.csv を {担当者: {月: 時間}} の辞書にする代わりに、担当者 × 月の2次元配列で持つ
+・各担当者の行は区間最大値のセグメント木（葉が各月の時間）になっていて、
+  「start以降で残り時間がN以上の最初の月」を O(log 月数) で検索できる
+・まとめて時間を引く・N時間以上ある月を一括で調べる・配列のコピーで状態を複製する、といった処理は NumPy で行う
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+class HoursLedger:
+    """
+    persons: 担当者名のリスト
+    months: 月ラベル（'YYYY-MM'）のリスト
+    hours: 担当者 × 月の時間（2次元配列）。整数でない値があれば float64、それ以外は int64 で持つ
+           （int64 の台帳に整数でない時間を足し引きすると、その時点で float64 に切り替える）
+    """
+
+    def __init__(self, persons, months, hours):
+        self.persons = list(persons)
+        self.months = list(months)
+        self.person_pos = {p: i for i, p in enumerate(self.persons)}
+        self.month_pos = {m: i for i, m in enumerate(self.months)}
+
+        hours = np.asarray(hours, dtype='float64').reshape(len(self.persons), len(self.months))
+        hours = np.nan_to_num(hours, nan=0.0)
+        integral = np.array_equal(hours, np.round(hours))
+        dtype = 'int64' if integral else 'float64'
+        self._padding = np.iinfo('int64').min if integral else -np.inf
+
+        size = 1
+        while size < max(len(self.months), 1):
+            size *= 2
+        self.size = size
+        self.tree = np.full((len(self.persons), 2 * size), self._padding, dtype=dtype)
+        self.tree[:, size:size + len(self.months)] = hours
+        self._rebuild()
+
+    @classmethod
+    def from_frame(cls, available_hours, months, person_column='担当者'):
+        """
+        労働可能時間の表（担当者列 + 月の列）から作る。無い月・空欄は0時間、同じ担当者が複数行あれば最後の行を使う。
+        月の列の見出しは日付（read_excel で読んだ場合など）や 'YYYY/MM' でもよい。対象期間の月が1つも無ければ ValueError。
+        """
+        df = available_hours.drop_duplicates(subset=person_column, keep='last').set_index(person_column)
+        df.columns = [month_label(c) for c in df.columns]
+        _check_months(df.columns, months)
+        values = df.reindex(columns=list(months))
+        values = values.apply(pd.to_numeric, errors='coerce').fillna(0)
+        return cls(values.index, months, values.to_numpy())
+
+    @classmethod
+    def from_dict(cls, hours, months):
+        """{担当者: {月: 時間}} から作る（無い月は0時間。月のキーは from_frame の見出しと同じく日付でもよい）。"""
+        persons = list(hours)
+        hours = {p: {month_label(m): h for m, h in hours[p].items()} for p in persons}
+        if persons:
+            _check_months({m for p in persons for m in hours[p]}, months)
+        values = [[_to_number(hours[p].get(m, 0)) for m in months] for p in persons]
+        return cls(persons, months, np.array(values, dtype='float64').reshape(len(persons), len(months)))
+
+    @property
+    def values(self):
+        """担当者 × 月の残り時間（配列のビュー。書き換える場合は subtract などを使う）。"""
+        return self.tree[:, self.size:self.size + len(self.months)]
+
+    def has_person(self, person):
+        return person in self.person_pos
+
+    def get(self, person, month):
+        return self.tree[self.person_pos[person], self.size + self.month_pos[month]].item()
+
+    def add(self, person, month_index, delta):
+        # 1か所だけ更新し、その葉から根までの最大値を直す
+        self._widen(delta)
+        row = self.tree[self.person_pos[person]]
+        node = self.size + month_index
+        row[node] += delta
+        node //= 2
+        while node:
+            row[node] = max(row[2 * node], row[2 * node + 1])
+            node //= 2
+
+    def subtract(self, persons, months, hours):
+        """
+        担当者・月の組ごとに時間をまとめて引く（同じ組が複数あればその分だけ引く）。
+        persons / months は名前・月ラベルの配列、hours はスカラーか同じ長さの配列。
+        """
+        p = np.array([self.person_pos[x] for x in persons], dtype='int64')
+        m = np.array([self.month_pos[x] for x in months], dtype='int64')
+        self._widen(hours)
+        hours = np.broadcast_to(np.asarray(hours, dtype=self.tree.dtype), p.shape)
+        np.subtract.at(self.tree, (p, self.size + m), hours)
+        self._rebuild()
+
+    def months_with_at_least(self, hours):
+        """担当者 × 月で、残り時間が hours 以上なら True の表。"""
+        return pd.DataFrame(self.values >= hours, index=self.persons, columns=self.months)
+
+    def first_month_at_least(self, hours, start=0):
+        """担当者ごとに、start番目以降の月で残り時間が hours 以上の最初の月の位置（無ければ-1）。"""
+        enough = self.values[:, start:] >= hours
+        first = enough.argmax(axis=1) + start
+        return np.where(enough.any(axis=1), first, -1)
+
+    def find_first(self, person, start, threshold):
+        # 担当者の start番目以降の月で、残り時間がthreshold以上となる最初の位置（無ければ-1）
+        n = len(self.months)
+        if start >= n:
+            return -1
+        row = self.tree[self.person_pos[person]]
+        node = self.size + max(start, 0)
+        # 条件を満たす部分木まで右へ進む
+        while row[node] < threshold:
+            while node & 1:
+                node >>= 1
+            if node == 0:
+                return -1
+            node += 1
+        # 部分木の中で最も左の葉まで下りる
+        while node < self.size:
+            node *= 2
+            if row[node] < threshold:
+                node += 1
+        i = node - self.size
+        return i if i < n else -1
+
+    def copy(self):
+        # シナリオ分析などで使う複製（配列だけをコピー）
+        clone = object.__new__(HoursLedger)
+        clone.__dict__.update(self.__dict__)
+        clone.tree = self.tree.copy()
+        return clone
+
+    def to_frame(self, person_column='担当者'):
+        """労働可能時間と同じ形（担当者列 + 月の列）の表にする。"""
+        df = pd.DataFrame(self.values, columns=self.months)
+        df.insert(0, person_column, self.persons)
+        return df
+
+    def _widen(self, hours):
+        # 整数の台帳に整数でない時間が来たら float64 にする（int64 のままだと小数点以下が切り捨てられる）
+        if self.tree.dtype.kind != 'i':
+            return
+        hours = np.asarray(hours, dtype='float64')
+        if np.array_equal(hours, np.round(hours)):
+            return
+        padding = self.tree == self._padding
+        self.tree = self.tree.astype('float64')
+        self.tree[padding] = -np.inf
+        self._padding = -np.inf
+
+    def _rebuild(self):
+        # 葉から上の段を順に、子2つの最大値で作り直す
+        level = self.size // 2
+        while level:
+            children = self.tree[:, 2 * level:4 * level]
+            self.tree[:, level:2 * level] = np.maximum(children[:, 0::2], children[:, 1::2])
+            level //= 2
+
+
+def month_label(value):
+    """月の見出し（'YYYY-MM'・'YYYY/MM'・日付）を 'YYYY-MM' にする。月として読めない値はそのまま返す。"""
+    if isinstance(value, pd.Period):
+        return value.strftime('%Y-%m')
+    if isinstance(value, (str, date, np.datetime64)):
+        parsed = pd.to_datetime(value, errors='coerce')
+        if not pd.isna(parsed):
+            return parsed.strftime('%Y-%m')
+    return value
+
+
+def _check_months(labels, months):
+    # 対象期間の月が1つも無い場合は、見出しの形式が違う可能性が高いので0時間として続けない
+    months = list(months)
+    if months and not set(labels) & set(months):
+        raise ValueError(f"労働可能時間に対象期間（{months[0]} 〜 {months[-1]}）の月がありません。"
+                         "月の見出しを確認してください。")
+
+
+def _to_number(value):
+    if pd.isna(value):
+        return 0
+    return value
@@ -0,0 +1,214 @@
+"""
+入力ファイルのキャッシュ
+・装置搬入スケジュール（csv）や管理表（xlsx）を、必要な列だけ読み込んで日付を正規化した状態で保存
+・キャッシュは元ファイルの隣の .schedule_cache フォルダに置き、ファイル内容のハッシュ・列・SCHEMA_VERSION が同じなら再利用
+  （ファイル名は「元のファイル名（拡張子込み）-読み込み条件のハッシュ-内容のハッシュ」。同じファイルを別の列・絞り込みで
+  読むスクリプトや、管理表.csv と 管理表.xlsx のキャッシュは別々に残り、古い内容のキャッシュだけを消す）
+・pyarrow があれば parquet、無ければ pickle で保存
+・csv はチャンクごとに読み込み、filters（エリアなど）に合わない行はその場で捨てる。
+  値の種類が少ない列（categories）はカテゴリ型にして、文字列オブジェクトを行数分持たない
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from date_utils import DATE_SENTINELS, NormalizedDates, STATUS_INVALID, normalize_dates
+
+# 保存形式や正規化の仕様を変えたら上げる
+SCHEMA_VERSION = 3
+
+CACHE_DIR_NAME = '.schedule_cache'
+STATUS_SUFFIX = '__区分'
+RAW_SUFFIX = '__元の値'
+
+# csv を読み込むときの1チャンクの行数
+CHUNK_SIZE = 100_000
+
+# 読み込んだ表のインデックス（データ行の0始まりの位置）に足すと、元のファイルの行番号
+# （見出しが1行目、Excel の行番号と同じ）になる
+LINE_OFFSET = 2
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pkl'
+
+
+def read_schedule(path, columns=None, date_columns=(), sheet_name=None, sentinels=DATE_SENTINELS, default=None,
+                  use_cache=True, report=True, filters=None, categories=(), chunksize=CHUNK_SIZE):
+    """
+    path を読み込み、(DataFrame, {日付列: NormalizedDates}) を返す。
+    columns: 読み込む列（省略時は全列）
+    date_columns: normalize_dates で正規化する列
+    sheet_name: xlsx のシート名
+    filters: {列: 残す値のリスト}。読み込みながら絞り込む（インデックスは元のファイルの位置のまま）
+    categories: カテゴリ型にする列
+    """
+    path = Path(path)
+    date_columns = list(date_columns)
+    filters = {column: list(values) for column, values in (filters or {}).items()}
+    categories = list(categories)
+    cache_path = None
+    if use_cache:
+        params = _params_key(columns, date_columns, sheet_name, sentinels, default, filters, categories)
+        cache_path = path.parent / CACHE_DIR_NAME / f'{path.name}-{params}-{file_digest(path)[:16]}'
+        df = _read_cache(cache_path)
+        if df is not None:
+            df, dates = _split_status(df, date_columns)
+            if report:
+                for result in dates.values():
+                    result.report()
+            return df, dates
+
+    df = _read_source(path, columns, sheet_name, filters, categories, chunksize)
+    dates = {}
+    for column in date_columns:
+        result = normalize_dates(df[column], sentinels=sentinels, default=default, name=column,
+                                 line_offset=LINE_OFFSET)
+        df[column] = result.dates
+        if report:
+            result.report()
+        dates[column] = result
+
+    if cache_path is not None:
+        _write_cache(cache_path, _join_status(df, dates))
+    return df, dates
+
+
+def clear_cache(path):
+    # path に対応するキャッシュを（読み込み条件によらず）すべて削除
+    path = Path(path)
+    for cached in _cached_files(path.parent / CACHE_DIR_NAME, path.name):
+        cached.unlink()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    # ファイル内容の sha256
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _params_key(columns, date_columns, sheet_name, sentinels, default, filters=None, categories=()):
+    # 読み込み条件のハッシュ（ファイルの内容は含まない）
+    params = json.dumps({
+        'version': SCHEMA_VERSION,
+        'columns': list(columns) if columns is not None else None,
+        'date_columns': date_columns,
+        'sheet_name': sheet_name,
+        'sentinels': list(sentinels),
+        'default': str(default) if default is not None else None,
+        'filters': {column: [str(v) for v in values] for column, values in (filters or {}).items()},
+        'categories': list(categories),
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+
+def _read_source(path, columns, sheet_name, filters=None, categories=(), chunksize=CHUNK_SIZE):
+    usecols = list(columns) if columns is not None else None
+    if path.suffix.lower() in ('.xlsx', '.xlsm', '.xls'):
+        # xlsx はチャンクで読めないので、必要な列だけを読んでから絞り込む
+        chunks = [pd.read_excel(path, sheet_name=sheet_name or 0, header=0, usecols=usecols)]
+    else:
+        chunks = pd.read_csv(path, usecols=usecols, chunksize=chunksize)
+    chunks = [_filter_chunk(chunk, filters, categories) for chunk in chunks]
+    if not chunks:
+        # データ行が無い csv は見出しだけの表にする
+        chunks = [_filter_chunk(pd.read_csv(path, usecols=usecols, nrows=0), filters, categories)]
+    df = _concat_chunks(chunks, categories)
+    # 指定した列の順に揃える
+    return df[usecols] if usecols is not None else df
+
+
+def _filter_chunk(chunk, filters, categories):
+    for column, values in (filters or {}).items():
+        chunk = chunk[chunk[column].isin(values)]
+    for column in categories:
+        # 文字列の列はチャンクのうちにカテゴリ型にする（数値の列は型が揃ってから最後にまとめて変換）
+        if chunk[column].dtype == object or pd.api.types.is_string_dtype(chunk[column]):
+            chunk = chunk.assign(**{column: chunk[column].astype('category')})
+    return chunk
+
+
+def _concat_chunks(chunks, categories):
+    if len(chunks) > 1:
+        # カテゴリを揃えてから連結しないと文字列の列に戻ってしまう
+        for column in categories:
+            if all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks):
+                dtype = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True).dtype
+                chunks = [chunk.assign(**{column: chunk[column].astype(dtype)}) for chunk in chunks]
+    df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    for column in categories:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _join_status(df, dates):
+    # 日付の区分と、読めなかったセルの元の値を列として一緒に保存する
+    df = df.copy()
+    for column, result in dates.items():
+        df[column + STATUS_SUFFIX] = result.status
+        df[column + RAW_SUFFIX] = result.raw.where(result.status == STATUS_INVALID).astype('string')
+    return df
+
+
+def _split_status(df, date_columns):
+    dates = {}
+    for column in date_columns:
+        status = df.pop(column + STATUS_SUFFIX).rename(column)
+        raw = df.pop(column + RAW_SUFFIX).rename(column)
+        dates[column] = NormalizedDates(column, raw, df[column], status, LINE_OFFSET)
+    return df, dates
+
+
+def _cached_files(cache_dir, name, params=None):
+    # 元のファイル名が name（params を指定した場合は読み込み条件も同じ）のキャッシュ
+    if not cache_dir.is_dir():
+        return []
+    found = []
+    for f in cache_dir.iterdir():
+        # 元のファイル名に '-' が含まれることがあるので右から分ける
+        parts = f.name.rsplit('-', 2)
+        if len(parts) == 3 and parts[0] == name and (params is None or parts[1] == params):
+            found.append(f)
+    return found
+
+
+def _read_cache(cache_path):
+    parquet_path = cache_path.with_name(cache_path.name + '.parquet')
+    pickle_path = cache_path.with_name(cache_path.name + '.pkl')
+    if CACHE_FORMAT == 'parquet' and parquet_path.exists():
+        return pd.read_parquet(parquet_path)
+    if pickle_path.exists():
+        return pd.read_pickle(pickle_path)
+    return None
+
+
+def _write_cache(cache_path, df):
+    cache_path.parent.mkdir(exist_ok=True)
+    # 同じ元ファイル・同じ読み込み条件の古い内容のキャッシュは削除
+    name, params, _ = cache_path.name.rsplit('-', 2)
+    for old in _cached_files(cache_path.parent, name, params):
+        old.unlink()
+    if CACHE_FORMAT == 'parquet':
+        try:
+            _write_atomic(cache_path.with_name(cache_path.name + '.parquet'), lambda f: df.to_parquet(f, index=True))
+            return
+        except (ValueError, TypeError):
+            # 型が混在した列など parquet にできない場合は pickle で保存
+            pass
+    _write_atomic(cache_path.with_name(cache_path.name + '.pkl'), df.to_pickle)
+
+
+def _write_atomic(target, write):
+    tmp_path = target.with_name(target.name + '.tmp')
+    write(tmp_path)
+    tmp_path.replace(target)
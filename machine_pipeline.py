@@ -0,0 +1,111 @@
+"""
+初号機 → 増設機のテスト時期を1回の読み込みで続けて算出する
+・20241207-first-machine.py と同じルールで各行の調整後テスト実施時期を求め、機種名ごとに最も早い月を
+  その機種の初号機テスト実施時期とする
+・初号機テスト実施時期は CSV/Excel に書き出して読み直す代わりに、機種名でメモリ上で結合して
+  20241207_expand_machine.py のルール（初号機テスト実施時期の翌月以降）に渡す
+・入力ファイルに手で転記された 初号機テスト実施時期 の列は使わないので、初号機の予定を変えても古い値が残らない
+・初号機・増設機の表と、リリース予定日が搬入日未定の機種の表を1つのブックの別シートに書き出す（--csv で従来の CSV も）
+
+使い方:
+    python machine_pipeline.py [装置搬入スケジュール2.csv] [--output-dir 出力先] [--csv]
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from input_cache import read_schedule
+from month_rules import adjusted_test_month
+from pivot_builder import UNDECIDED, build_schedule_pivot
+from xlsx_export import write_tables
+
+# 初号機・増設機の両方のルールで使う列
+COLUMNS = ['工程', '機種名', 'リリース予定日', '開発テスト完了予定日', '受入テスト実施日']
+DATE_COLUMNS = ['リリース予定日', '開発テスト完了予定日', '受入テスト実施日']
+VALID_AREAS = ['SubBE', 'EPI', 'WP表', 'WP裏', 'EDS']
+
+FIRST_MACHINE_OUTPUT = 'test_schedule_with_first_machine.csv'
+EXPAND_MACHINE_OUTPUT = 'test_schedule_with_out_of_range3.csv'
+WORKBOOK_OUTPUT = 'test_schedule_machines.xlsx'
+
+
+def first_machine_months(schedule, key_column='機種名', variant='first_machine'):
+    """
+    各行の調整後テスト実施時期（初号機のルール）と、機種名ごとの初号機テスト実施時期を返す。
+    機種名ごとの値は、その機種の行で最も早い調整後テスト実施時期（どの行も算出できなければ NaT）。
+    """
+    adjusted = adjusted_test_month(schedule, variant)
+    first_months = adjusted.groupby(schedule[key_column].to_numpy(), sort=False).min()
+    return adjusted, first_months.rename('初号機テスト実施時期')
+
+
+def expand_machine_months(schedule, first_months, key_column='機種名', variant='expand_machine'):
+    """機種名で初号機テスト実施時期を結合し、増設機のルールで調整後テスト実施時期を返す。"""
+    df = pd.DataFrame({
+        'リリース予定日': schedule['リリース予定日'],
+        '初号機テスト実施時期': schedule[key_column].map(first_months).astype('datetime64[ns]'),
+    }, index=schedule.index)
+    return adjusted_test_month(df, variant)
+
+
+def run_pipeline(equipment_schedule_path, start='2024-10-01', end='2026-03-31', valid_areas=VALID_AREAS):
+    """
+    装置搬入スケジュールを1回だけ読み込み、(初号機の表, 増設機の表, 行ごとの結果) を返す。
+    行ごとの結果は入力の行に 初号機の調整後テスト実施時期・初号機テスト実施時期・増設機の調整後テスト実施時期・
+    搬入日未定（リリース予定日が搬入日未定かどうか）を加えたもの。
+    """
+    schedule, dates = read_schedule(
+        equipment_schedule_path, columns=COLUMNS, date_columns=DATE_COLUMNS,
+        filters={'工程': list(valid_areas)}, categories=['工程'],
+    )
+    undecided = dates['リリース予定日'].sentinels_in(schedule)
+
+    first_adjusted, first_months = first_machine_months(schedule)
+    expand_adjusted = expand_machine_months(schedule, first_months)
+
+    rows = schedule.assign(**{
+        '初号機の調整後テスト実施時期': first_adjusted,
+        '初号機テスト実施時期': schedule['機種名'].map(first_months).astype('datetime64[ns]'),
+        '増設機の調整後テスト実施時期': expand_adjusted,
+        UNDECIDED: undecided,
+    })
+    # 2024年10月から2026年3月の範囲内は年月の列、範囲外・搬入日未定はそれぞれの列に振り分け、工程×列で機種名を改行でつなぐ
+    first_pivot = build_schedule_pivot(rows, '初号機の調整後テスト実施時期', start, end, undecided=undecided,
+                                       extra_columns=['搬入日未定', '範囲外'])
+    expand_pivot = build_schedule_pivot(rows, '増設機の調整後テスト実施時期', start, end, undecided=undecided,
+                                        extra_columns=['搬入日未定', '範囲外'])
+    return first_pivot, expand_pivot, rows
+
+
+def undecided_table(rows, row_order=VALID_AREAS):
+    """run_pipeline の行ごとの結果から、リリース予定日が搬入日未定の機種名を工程ごとに改行でつないだ表を作る。"""
+    undecided = rows[rows[UNDECIDED]]
+    names = undecided['機種名'].astype(str).groupby(undecided['工程'].astype(object), sort=False).agg('\n'.join)
+    return names.reindex(list(row_order), fill_value='').rename_axis('工程').to_frame(UNDECIDED)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='初号機と増設機のテストスケジュールを1回の読み込みで作成する')
+    parser.add_argument('equipment_schedule_path', nargs='?', default='/excel/装置搬入スケジュール2.csv')
+    parser.add_argument('--output-dir', default='/excel')
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2026-03-31')
+    parser.add_argument('--csv', action='store_true', help='初号機・増設機の表を従来の CSV にも書き出す')
+    args = parser.parse_args()
+
+    first_pivot, expand_pivot, rows = run_pipeline(args.equipment_schedule_path, args.start, args.end)
+    output_dir = Path(args.output_dir)
+    # 初号機・増設機・搬入日未定を1つのブックの別シートに、工程の並び順をそろえて書き出す
+    sheets = {'初号機': first_pivot, '増設機': expand_pivot, UNDECIDED: undecided_table(rows)}
+    workbook_path = write_tables(output_dir / WORKBOOK_OUTPUT, sheets, row_order=VALID_AREAS)
+    print(f"初号機・増設機のスケジュールがエクセルファイルに保存されました: {workbook_path}")
+    if args.csv:
+        first_pivot.to_csv(output_dir / FIRST_MACHINE_OUTPUT, encoding='utf-8-sig')
+        expand_pivot.to_csv(output_dir / EXPAND_MACHINE_OUTPUT, encoding='utf-8-sig')
+        print("初号機・増設機のスケジュールがCSVファイルに保存されました。")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+複数サイトの管理表をまとめて割り当てる（改定版.py をサイトごとに別々に実行すると、共通の担当者を二重に予約してしまう）
+・サイトごとの管理表の読み込み・絞り込み・優先順位の算出はプロセスプールで並列に行う
+・全サイトの装置を最終優先順位・リリース予定日の順（同じ順位ならサイトを指定した順）に並べ、
+  1つの労働可能時間の台帳と月ごとのテスト可能台数に対して改定版.py と同じ手順で1回だけ割り当てる
+  （装置が多い場合は、互いに影響しない装置のまとまりごとに並列に割り当てる。parallel_allocation を参照）
+・割り当て結果はサイトごとに分けて、改定版.py と同じ形の表（エリア × 月）と縦持ちの表を書き出す
+
+使い方:
+    python multi_site.py 労働可能時間.csv 月ごとのテスト可能台数.csv A棟=管理表A.csv B棟=管理表B.xlsx [--output-dir 出力先]
+    （サイト名を省略した場合はファイル名をサイト名にする）
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from allocator import ScheduleBuffer, _month_labels_of, allocate_devices, month_labels, placement_order
+from devices import PROCESS_PRIORITY, load_allocator, load_devices, prepare_devices
+from profiler import add_profile_arguments, profiler_from_args
+
+SITE_COLUMN = 'サイト'
+
+
+def load_sites(sites, process_priority=PROCESS_PRIORITY, workers=None):
+    """
+    sites: {サイト名: 管理表のパス}
+    サイトごとに読み込んで絞り込み・優先順位の順に並べた装置を {サイト名: DataFrame} で返す（サイトの順は sites の順）。
+    """
+    names = list(sites)
+    tasks = [(sites[name], process_priority) for name in names]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    if workers == 1:
+        frames = [_load_site(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_load_site, tasks))
+    return dict(zip(names, frames))
+
+
+def merge_sites(site_devices):
+    """サイトごとの装置を1つの表にし、最終優先順位・リリース予定日の順に並べる（同じ順位ならサイトの順・元の順）。"""
+    frames = [df.assign(**{SITE_COLUMN: name}) for name, df in site_devices.items()]
+    if not frames:
+        return pd.DataFrame(columns=[SITE_COLUMN])
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.sort_values(by=['最終優先順位', 'リリース予定日'], ascending=[True, True], kind='stable')
+
+
+def allocate_sites(site_devices, allocator, test_hours_needed=40, log=print, workers=None):
+    """
+    全サイトの装置を1つの割り当てエンジン（allocator）に対して割り当てる。
+    workers を指定すると、互いに影響しない装置のまとまりごとに並列に割り当てる（結果は同じ）。
+    戻り値は (割り当て月の列を加えた全サイトの装置, {サイト名: ScheduleBuffer})。
+    """
+    merged = merge_sites(site_devices)
+    assigned = allocate_devices(merged, allocator, test_hours_needed, log=log, workers=workers)
+    merged = merged.assign(割り当て月=assigned)
+
+    # サイトごとに、割り当てた順（確定月がある装置 → 残りの装置）でバッファに入れる
+    order = placement_order(_month_labels_of(merged['受け入れテスト実施日']))
+    in_order = merged.iloc[order]
+    buffers = {}
+    for name in site_devices:
+        rows = in_order[in_order[SITE_COLUMN] == name]
+        buffers[name] = ScheduleBuffer()
+        buffers[name].add_devices(rows, rows['割り当て月'])
+    return merged, buffers
+
+
+def write_site_schedules(buffers, months, output_dir, process_priority=PROCESS_PRIORITY):
+    """サイトごとに <サイト名>_test_schedule5.csv（エリア × 月）と <サイト名>_test_schedule5_long.csv を書き出す。"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, buffer in buffers.items():
+        path = output_dir / f'{name}_test_schedule5.csv'
+        buffer.render(months, process_priority.keys()).to_csv(path)
+        buffer.to_frame().to_csv(output_dir / f'{name}_test_schedule5_long.csv', index=False, encoding='utf-8-sig')
+        paths.append(path)
+    return paths
+
+
+def parse_sites(values):
+    """'サイト名=パス' または 'パス'（サイト名はファイル名）のリストを {サイト名: パス} にする。"""
+    sites = {}
+    for value in values:
+        name, sep, path = value.partition('=')
+        if not sep:
+            name, path = Path(value).stem, value
+        if name in sites:
+            raise ValueError(f"サイト名 {name} が重複しています。'サイト名=パス' の形で指定してください。")
+        sites[name] = path
+    return sites
+
+
+def _load_site(task):
+    path, process_priority = task
+    equipment_schedule, _ = load_devices(path, areas=tuple(process_priority))
+    return prepare_devices(equipment_schedule, process_priority)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='複数サイトの管理表を共通の担当者・テスト可能台数でまとめて割り当てる')
+    parser.add_argument('available_hours_path')
+    parser.add_argument('monthly_capacity_path')
+    parser.add_argument('sites', nargs='+', help="サイトの管理表（'サイト名=パス' またはパス）")
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2025-10-31')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output-dir', default='.')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    sites = parse_sites(args.sites)
+    months = month_labels(args.start, args.end)
+    with profiler.stage('読み込み・絞り込み') as s:
+        site_devices = load_sites(sites, workers=args.workers)
+        allocator = load_allocator(args.available_hours_path, args.monthly_capacity_path, months)
+        s.output(sum(len(df) for df in site_devices.values()))
+    with profiler.stage('割り当て', rows_in=sum(len(df) for df in site_devices.values())) as s:
+        merged, buffers = allocate_sites(site_devices, allocator, workers=args.workers)
+        s.output(merged['割り当て月'].notna().sum())
+    with profiler.stage('出力', rows_in=len(merged)):
+        paths = write_site_schedules(buffers, months, args.output_dir)
+
+    summary = merged.groupby(SITE_COLUMN, sort=False)['割り当て月'].agg(装置数='size', 割り当て済み='count')
+    print(summary.reindex(list(sites)))
+    print(f"サイトごとのスケジュールがCSVファイルに保存されました: {', '.join(str(p) for p in paths)}")
+    profiler.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,11 @@
+import sys
+from pathlib import Path
 import pandas as pd
 
+# 共通モジュールはリポジトリ直下にある
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from carry_over import carry_over_table
+
 # CSVファイルを読み込む
 file_path =_のコピー.csv"  # ファイルパスを指定
 data = pd.read_csv(file_path)
@@ -12,38 +18,8 @@ data['Testable'] = data['Testable'].astype(int)
 # テスト上限を固定値として設定
 test_limit = 3
 
-# 計算用の列を初期化
-data['Tested'] = 0
-data['CarryOver'] = 0
-
-carry_over = 0  # 初期繰越
-
-# 月ごとの計算
-for i in range(len(data)):
-    available_units = data.loc[i, 'Testable'] + carry_over
-    tested_units = min(available_units, test_limit)
-    carry_over = available_units - tested_units
-
-    data.loc[i, 'Tested'] = tested_units
-    data.loc[i, 'CarryOver'] = carry_over
-
-# テストが終わるまで月を追加
-while carry_over > 0:
-    next_month = f"Month {len(data) + 1}"
-    data = pd.concat(
-        [
-            data,
-            pd.DataFrame({"Month": [next_month], "Testable": [0], "Tested": [0], "CarryOver": [0]}),
-        ],
-        ignore_index=True,
-    )
-
-    available_units = carry_over
-    tested_units = min(available_units, test_limit)
-    carry_over = available_units - tested_units
-
-    data.loc[len(data) - 1, 'Tested'] = tested_units
-    data.loc[len(data) - 1, 'CarryOver'] = carry_over
+# 月ごとのテスト台数と繰越を一括計算し、繰越が無くなるまで月を追加
+data = carry_over_table(data, test_limit=test_limit, extra_limit=test_limit)
 
 # データを月を横軸に転置
 transposed_data = data.set_index('Month').T
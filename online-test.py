@@ -1,6 +1,7 @@
 import pandas as pd
-import numpy as np
 from datetime import datetime
+from allocator import CapacityAllocator, ScheduleBuffer, allocate_devices, month_labels
+from devices import final_priority
 
 # ファイルパス
 equipment_schedule_path = '装置搬入スケジュール改訂版.csv'
@@ -18,56 +19,31 @@ filtered_schedule = equipment_schedule[(equipment_schedule['オンライン'] ==
 
 # 以降のスケジュール生成ロジックは、filtered_scheduleを使用して実行
 
-# 優先順位の数値化
-def extract_priority(note):
-    if pd.isna(note):
-        return np.nan
-    elif "特別優先" in note:
-        return int(note.replace("特別優先", "").replace("位", ""))
-    return np.nan
-
-# 特別優先順位を抽出
-filtered_schedule['特別優先順位'] = filtered_schedule['備考'].apply(extract_priority)
-
-# 工程の優先順位をマッピング
+# 工程の優先順位
 process_priority = {'SubBE': 3, 'EPI': 2, 'WP表': 1}
-filtered_schedule['工程優先順位'] = filtered_schedule['工程'].map(process_priority)
 
-# 特別優先順位と工程優先順位を統合して最終的な優先順位を設定
-filtered_schedule['最終優先順位'] = filtered_schedule['特別優先順位'].fillna(filtered_schedule['工程優先順位'])
+# 備考の特別優先順位（特別優先N位）と工程優先順位を統合して最終的な優先順位を設定
+filtered_schedule['最終優先順位'] = final_priority(filtered_schedule['備考'], filtered_schedule['工程'], process_priority)
 filtered_schedule.sort_values(by=['最終優先順位', '搬入日'], ascending=[True, True], inplace=True)
 
-# 担当者の利用可能時間のデータフレームを担当者名をキーにした辞書に変換
-available_hours_dict = available_hours.set_index('担当者').to_dict('index')
+# 担当者の利用可能時間と月ごとのテスト可能台数を割り当てエンジンに登録
+schedule_months = month_labels('2024-11-01', '2025-10-31')
+allocator = CapacityAllocator.from_frames(available_hours, monthly_capacity, schedule_months)
 
-# 月ごとのテスト可能台数を辞書に変換
-monthly_capacity_dict = monthly_capacity.set_index('月')['テスト可能台数'].to_dict()
+# 割り当て結果（月・工程・担当者・機種名）を割り当てた順に貯める
+schedule_buffer = ScheduleBuffer(area_column='工程', person_column='仕様決め担当者', drawing_column=None,
+                                 device_column='機種名')
 
-# スケジュールの初期化
-schedule = pd.DataFrame(index=pd.date_range('2024-11-01', '2025-10-31', freq='M').strftime('%Y-%m'), columns=process_priority.keys())
+# テスト割り当ての実装（搬入日の月以降で、担当者の時間と月の台数に空きがある最初の月）
+test_hours_needed = 40  # テストに必要な時間
+allocate_devices(filtered_schedule, allocator, test_hours_needed, fixed_column=None, release_column='搬入日',
+                 person_column='仕様決め担当者', buffer=schedule_buffer)
 
-# テスト割り当ての実装
-for index, row in filtered_schedule.iterrows():
-    device_name = row['機種名']
-    process = row['工程']
-    incharge = row['仕様決め担当者']
-    start_date = pd.to_datetime(row['搬入日'])
-    start_month = start_date.strftime('%Y-%m')
-    test_hours_needed = 40  # テストに必要な時間
-    
-    for month in pd.date_range(start_month, '2025-10-31', freq='M').strftime('%Y-%m'):
-        if available_hours_dict[incharge][month] >= test_hours_needed and monthly_capacity_dict[month] > 0:
-            entry = f'({incharge}) {device_name}'
-            if pd.isna(schedule.at[month, process]):
-                schedule.at[month, process] = entry
-            else:
-                schedule.at[month, process] += '\n' + entry
-            available_hours_dict[incharge][month] -= test_hours_needed
-            monthly_capacity_dict[month] -= 1
-            break
+# 工程 × 月の表にまとめる（同じセルの機種は割り当てた順に改行でつなぐ）
+transposed_schedule = schedule_buffer.render(schedule_months, process_priority.keys(), entry_format='({担当者}) {設備}')
 
-schedule.fillna('', inplace=True)
 # スケジュールをCSVファイルに保存
-transposed_schedule = schedule.T # 行と列を入れ替え
 transposed_schedule.to_csv('test_schedule2.csv')
+# 1行1台の縦持ちの表（他のツールでの集計用）
+schedule_buffer.to_frame().to_csv('test_schedule2_long.csv', index=False, encoding='utf-8-sig')
 print("スケジュールがCSVファイルに保存されました。")
\ No newline at end of file
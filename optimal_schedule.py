@@ -0,0 +1,292 @@
+"""
+テスト可能台数・担当者の時間の範囲で、割り当てられる装置の台数を最大にする割り当て（改定版.py の貪欲法の代わり）
+・各装置の担当者は決まっているので、割り当ては
+  装置 → (担当者, 月)（労働可能時間 ÷ テスト時間 台まで）→ 月（テスト可能台数まで）
+  のネットワークの流れになり、最大の台数は増加路を探すことで厳密に求まる（MILP ソルバーは使わない）
+・まず貪欲法（改定版.py と同じ手順）で割り当て、割り当てられなかった装置を割り当ての順（確定月がある装置 →
+  最終優先順位・リリース予定日の順）に1台ずつ、他の装置の月をずらしてでも入れられるかを増加路で調べる
+  ・貪欲法で割り当てた装置が外れることはない（月は変わることがある）
+  ・割り当てられる装置の組は（最大流の）マトロイドになるので、この順で入れていくと台数が最大になり、
+    その中で優先順位の高い装置ほど優先して入る
+  ・入れられなかった装置より条件が厳しい装置（同じ担当者で、入れられる月が同じかそれより少ない装置）は調べない
+・time_limit 秒を超えたらそこまでの結果（貪欲法以上の台数）を返す
+
+使い方:
+    python optimal_schedule.py [管理表] [労働可能時間] [テスト可能台数] [--time-limit 10]
+"""
+
+import argparse
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from allocator import ScheduleBuffer, _month_labels_of, assign_months, month_labels, placement_order
+from devices import PROCESS_PRIORITY, load_allocator, load_devices, prepare_devices
+from profiler import add_profile_arguments, profiler_from_args
+
+
+def optimize_months(persons, fixed_months, release_months, allocator, test_hours_needed=40, time_limit=10.0):
+    """
+    割り当てられる台数が最大になる割り当て月のリスト（割り当てなければNone）と、結果の概要を返す。
+    allocator には最終的な割り当てを予約として反映する。
+    概要: {'貪欲法': 台数, '最適化': 台数, '探索完了': time_limit 内に調べ終えたか, '時間(秒)': 経過時間}
+    """
+    started = time.perf_counter()
+    greedy = assign_months(persons, fixed_months, release_months, allocator.copy(), test_hours_needed, log=None)
+    flow = _Flow(persons, fixed_months, release_months, allocator, test_hours_needed, greedy)
+
+    complete = fill_unassigned(flow, placement_order(fixed_months), started + time_limit)
+    assigned = flow.assigned()
+    _reserve(allocator, persons, assigned, test_hours_needed)
+    summary = {
+        '貪欲法': sum(m is not None for m in greedy),
+        '最適化': sum(m is not None for m in assigned),
+        '探索完了': complete,
+        '時間(秒)': round(time.perf_counter() - started, 3),
+    }
+    return assigned, greedy, summary
+
+
+def fill_unassigned(flow, order, deadline=math.inf):
+    """
+    割り当てられていない装置を order の順に、増加路で入れられるだけ入れる（_Flow を書き換える）。
+    deadline（time.perf_counter の値）までに調べ終えたかを返す。
+    """
+    fail_from = {}
+    fail_fixed = set()
+    for d in order:
+        if flow.month_of[d] >= 0 or not flow.candidates[d] or not flow.allowed(d):
+            continue
+        if time.perf_counter() > deadline:
+            return False
+        # 担当者の候補が同じで、入れられる月が同じかより多い装置を入れられなかった場合は、この装置も入れられない
+        key = flow.candidates[d]
+        if flow.start[d] >= fail_from.get(key, math.inf) or (flow.fixed[d] and (key, flow.start[d]) in fail_fixed):
+            continue
+        if not flow.augment(d):
+            if flow.fixed[d]:
+                fail_fixed.add((key, flow.start[d]))
+            else:
+                fail_from[key] = min(fail_from.get(key, math.inf), flow.start[d])
+    return True
+
+
+def allocate_devices_optimal(devices, allocator, test_hours_needed=40, fixed_column='受け入れテスト実施日',
+                             release_column='リリース予定日', person_column='オンラインテスト担当者', buffer=None,
+                             time_limit=10.0):
+    """
+    allocator.allocate_devices の最適化版。戻り値は (割り当て月のSeries, 貪欲法の割り当て月のSeries, 概要)。
+    buffer（ScheduleBuffer）を渡すと、割り当てた装置を割り当ての順（確定月がある装置 → 残りの装置）に追加する。
+    """
+    persons = devices[person_column].to_numpy()
+    release_months = _month_labels_of(devices[release_column])
+    if fixed_column is not None and fixed_column in devices.columns:
+        fixed_months = _month_labels_of(devices[fixed_column])
+    else:
+        fixed_months = [None] * len(devices)
+    assigned, greedy, summary = optimize_months(persons, fixed_months, release_months, allocator, test_hours_needed,
+                                                time_limit)
+    assigned = pd.Series(assigned, index=devices.index, dtype=object)
+    greedy = pd.Series(greedy, index=devices.index, dtype=object)
+    if buffer is not None:
+        order = placement_order(fixed_months)
+        buffer.add_devices(devices.iloc[order], assigned.iloc[order])
+    return assigned, greedy, summary
+
+
+def throughput_by_month(greedy, optimal, months):
+    """月ごとの割り当て台数（貪欲法・最適化・差）の表。最後の行は合計。"""
+    table = pd.DataFrame({
+        '貪欲法': pd.Series(greedy).value_counts().reindex(months, fill_value=0),
+        '最適化': pd.Series(optimal).value_counts().reindex(months, fill_value=0),
+    })
+    table['差'] = table['最適化'] - table['貪欲法']
+    table.loc['合計'] = table.sum()
+    return table
+
+
+class _Flow:
+    # 装置 → (担当者, 月) → 月 の流れ。各装置は担当者と割り当て月（-1は未割り当て）を1つずつ持つ
+    # candidates: 装置ごとの担当者の候補（省略時は persons の担当者だけ）。assigned は persons の担当者での割り当て月
+
+    def __init__(self, persons, fixed_months, release_months, allocator, test_hours_needed, assigned, candidates=None):
+        months = allocator.months
+        self.n_months = len(months)
+        ledger = allocator.ledger
+        self.persons = ledger.persons
+        self.person_of = [ledger.person_pos.get(p, -1) for p in persons]
+        if candidates is None:
+            candidates = [[p] for p in persons]
+        # 台帳に無い担当者は候補から外す（同じ候補の装置をまとめて扱えるように tuple にする）
+        self.candidates = [tuple(dict.fromkeys(ledger.person_pos[q] for q in c if q in ledger.person_pos))
+                           for c in candidates]
+        self.fixed = [m is not None for m in fixed_months]
+        self.start = []
+        for fixed, release in zip(fixed_months, release_months):
+            if fixed is not None:
+                self.start.append(allocator.month_pos.get(fixed, -1))
+            elif release is not None:
+                self.start.append(allocator._start_index(release))
+            else:
+                self.start.append(-1)
+
+        # (担当者, 月) に入れられる台数と、月に入れられる台数（貪欲法と同じく、残りが必要量以上・0より多い間は入る）
+        hours = np.maximum(ledger.values.astype('float64'), 0)
+        self.slot_cap = np.floor(hours / test_hours_needed).astype('int64') if test_hours_needed > 0 else \
+            np.full(hours.shape, len(persons), dtype='int64')
+        capacity = np.array([allocator.capacity.get(i) for i in range(self.n_months)], dtype='float64')
+        self.month_cap = np.ceil(np.maximum(capacity, 0)).astype('int64')
+
+        self.month_of = [-1] * len(persons)
+        self.slot_count = np.zeros_like(self.slot_cap)
+        self.month_count = np.zeros(self.n_months, dtype='int64')
+        # (担当者, 月) ごとの装置と、月ごとに装置がいる担当者
+        self.slot_devices = {}
+        self.month_persons = [set() for _ in range(self.n_months)]
+        self.months = months
+        for d, month in enumerate(assigned):
+            if month is not None:
+                self._move(d, self.person_of[d], allocator.month_pos[month])
+
+    def allowed(self, d):
+        if self.start[d] < 0:
+            return range(0)
+        if self.fixed[d]:
+            return range(self.start[d], self.start[d] + 1)
+        return range(self.start[d], self.n_months)
+
+    def assigned(self):
+        return [self.months[m] if m >= 0 else None for m in self.month_of]
+
+    def assigned_persons(self):
+        return [self.persons[p] if p >= 0 else None for p in self.person_of]
+
+    def augment(self, d0):
+        # 幅優先で増加路を探す。節点は ('f', p, m)（装置が入ってくる枠）、('b', p, m)（月から押し戻された枠）、
+        # ('d', d)（枠から出る装置）、('M', m)（満杯の月）
+        parent = {}
+        queue = deque()
+        for q in self.candidates[d0]:
+            for m in self.allowed(d0):
+                node = ('f', q, m)
+                if node not in parent:
+                    parent[node] = ('d', d0)
+                    queue.append(node)
+        seen_devices = {d0}
+        seen_months = set()
+
+        while queue:
+            node = queue.popleft()
+            kind, p, m = node
+            if kind == 'f' and self.slot_count[p, m] < self.slot_cap[p, m]:
+                if self.month_count[m] < self.month_cap[m]:
+                    self._apply(node, parent)
+                    return True
+                # 月が満杯なら、その月の他の装置を別の月へ押し出す
+                if m not in seen_months:
+                    seen_months.add(m)
+                    month_node = ('M', m)
+                    parent[month_node] = node
+                    for q in self.month_persons[m]:
+                        back = ('b', q, m)
+                        if back not in parent:
+                            parent[back] = month_node
+                            queue.append(back)
+            # 枠にいる装置を別の月（候補の別の担当者）へ移す
+            for d in self.slot_devices.get((p, m), ()):
+                if d in seen_devices:
+                    continue
+                seen_devices.add(d)
+                parent[('d', d)] = node
+                for q in self.candidates[d]:
+                    for m2 in self.allowed(d):
+                        if (q, m2) == (p, m):
+                            continue
+                        forward = ('f', q, m2)
+                        if forward not in parent:
+                            parent[forward] = ('d', d)
+                            queue.append(forward)
+        return False
+
+    def _apply(self, node, parent):
+        # 経路上の装置を、それぞれ経路で次にある枠（担当者・月）へ移す
+        # 最初の装置（探索の起点）だけは parent に無い
+        moves = []
+        while True:
+            previous = parent[node]
+            if previous[0] == 'd' and node[0] == 'f':
+                moves.append((previous[1], node[1], node[2]))
+            if previous not in parent:
+                break
+            node = previous
+        for d, p, m in moves:
+            self._move(d, p, m)
+
+    def _move(self, d, p, m):
+        old_p, old = self.person_of[d], self.month_of[d]
+        if old >= 0:
+            self.slot_count[old_p, old] -= 1
+            self.month_count[old] -= 1
+            devices = self.slot_devices[(old_p, old)]
+            devices.remove(d)
+            if not devices:
+                self.month_persons[old].discard(old_p)
+        self.person_of[d] = p
+        self.month_of[d] = m
+        self.slot_count[p, m] += 1
+        self.month_count[m] += 1
+        self.slot_devices.setdefault((p, m), []).append(d)
+        self.month_persons[m].add(p)
+
+
+def _reserve(allocator, persons, assigned, test_hours_needed):
+    placed = [i for i, m in enumerate(assigned) if m is not None]
+    allocator.ledger.subtract([persons[i] for i in placed], [assigned[i] for i in placed], test_hours_needed)
+    counts = np.bincount([allocator.month_pos[assigned[i]] for i in placed], minlength=len(allocator.months))
+    for month_index in np.flatnonzero(counts):
+        allocator.capacity.add(int(month_index), -int(counts[month_index]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='割り当てられる台数が最大になるテストスケジュールを作成する')
+    parser.add_argument('equipment_schedule_path', nargs='?', default='装置アドレス、オンラインテスト管理表.csv')
+    parser.add_argument('available_hours_path', nargs='?', default='労働可能時間.csv')
+    parser.add_argument('monthly_capacity_path', nargs='?', default='月ごとのテスト可能台数.csv')
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2025-10-31')
+    parser.add_argument('--time-limit', type=float, default=10.0, help='探索の制限時間（秒）')
+    parser.add_argument('--output', default='test_schedule5_optimal.csv')
+    parser.add_argument('--comparison', default='test_schedule5_comparison.csv', help='月ごとの台数の比較の出力先')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    with profiler.stage('読み込み') as s:
+        equipment_schedule, _ = load_devices(args.equipment_schedule_path)
+        months = month_labels(args.start, args.end)
+        allocator = load_allocator(args.available_hours_path, args.monthly_capacity_path, months)
+        s.output(equipment_schedule)
+    with profiler.stage('絞り込み・優先順位', rows_in=equipment_schedule) as s:
+        devices = s.output(prepare_devices(equipment_schedule))
+    with profiler.stage('割り当て（最適化）', rows_in=devices) as s:
+        buffer = ScheduleBuffer()
+        assigned, greedy, summary = allocate_devices_optimal(devices, allocator, buffer=buffer,
+                                                             time_limit=args.time_limit)
+        s.output(assigned.notna().sum())
+    with profiler.stage('出力', rows_in=len(buffer)):
+        buffer.render(months, PROCESS_PRIORITY.keys()).to_csv(args.output)
+        comparison = throughput_by_month(greedy.dropna(), assigned.dropna(), months)
+        comparison.to_csv(args.comparison, encoding='utf-8-sig')
+
+    print(comparison)
+    status = '' if summary['探索完了'] else '（制限時間で打ち切り）'
+    print(f"貪欲法 {summary['貪欲法']} 台 → 最適化 {summary['最適化']} 台{status}")
+    print(f"スケジュールがCSVファイルに保存されました: {args.output}")
+    profiler.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+月ごとの上限を超えた分を翌月以降に繰り越すテスト実施月の割り当て（=PY(.ini の Power Query AssignTestMonth の置き換え）
+・Date の昇順、SubBE / EPI / WP表 / WP裏 の降順で並べ、上から順に Date の月以降で空きのある最初の月に入れる
+・並べた順に「枠番号」（月 × 上限 + 月内の順番）を振ると、枠番号 t[i] = max(上限 × 月[i], t[i-1] + 1) になる。
+  t[i] - i の累積最大値で一括計算できるので、1件ごとに割り当て済みの一覧を見直す必要は無い
+・月は datetime64[M]（暦の月）で数えるので、30日ずつずらす近似は使わない
+"""
+
+import numpy as np
+import pandas as pd
+
+# AssignTestMonth と同じ並べ替えのキー（Date は昇順、工程の列は降順）
+SORT_COLUMNS = ['SubBE', 'EPI', 'WP表', 'WP裏']
+
+
+def assign_test_months(df, max_per_month=15, date_column='Date', sort_columns=SORT_COLUMNS,
+                       flag_column='増設機', flag='◯'):
+    """
+    flag_column が flag の行を対象に、TestMonth（月初日）列を追加した表を AssignTestMonth と同じ順で返す。
+    flag_column が None または表に無い場合は全行を対象にする。Date が空欄の行は TestMonth も空欄。
+    """
+    if max_per_month <= 0:
+        raise ValueError("max_per_month は1以上を指定してください。")
+    if flag_column is not None and flag_column in df.columns:
+        df = df[df[flag_column].astype('string').str.strip() == flag]
+    df = df.copy()
+    df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
+
+    sort_columns = [c for c in sort_columns if c in df.columns]
+    df = df.sort_values([date_column] + sort_columns, ascending=[True] + [False] * len(sort_columns),
+                        kind='stable', na_position='last').reset_index(drop=True)
+
+    months = df[date_column].to_numpy(dtype='datetime64[M]')
+    valid = ~np.isnat(months)
+    test_months = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[M]')
+    test_months[valid] = overflow_months(months[valid], max_per_month)
+    df['TestMonth'] = test_months.astype('datetime64[ns]')
+    return df
+
+
+def overflow_months(months, max_per_month=15):
+    """昇順の月（datetime64[M]）を、各月 max_per_month 件までで翌月以降に繰り越した月にする。"""
+    months = np.asarray(months, dtype='datetime64[M]')
+    if len(months) == 0:
+        return months
+    ordinal = months.astype('int64')
+    i = np.arange(len(ordinal))
+    # 枠番号 t[i] = i + max(上限 × 月[j] - j, j <= i)
+    slots = i + np.maximum.accumulate(ordinal * max_per_month - i)
+    return (slots // max_per_month).astype('datetime64[M]')
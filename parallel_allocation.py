@@ -0,0 +1,137 @@
+"""
+互いに影響しない装置のまとまり（連結成分）ごとに、割り当てを別プロセスで並列に行う
+・同じ担当者の装置は労働可能時間を取り合うので同じ成分にする
+・月のテスト可能台数は全員で共有しているが、その月に入る可能性のある装置の数
+  （確定月がその月の装置 + リリース月がその月以前の装置）が台数以下の月は、どの順で置いても満杯にならない。
+  満杯になり得る月があれば、その月に入る可能性のある装置はすべて同じ成分にする
+・成分どうしは担当者も満杯になり得る月も共有しないので、別々に割り当てても1台ずつ順に割り当てた結果と同じになる
+・結果は装置の位置で並べ直し、割り当てエンジンへの予約とログは元の割り当て順で反映するので、ワーカー数によらず同じになる
+・1台あたりの割り当ては速いので、装置数が少ない場合や成分が1つしかない場合はそのまま順に割り当てる
+・満杯になり得る月があると、それ以前にリリースされる装置はすべて1つの成分になる。テスト可能台数に余裕の無い
+  計画では成分がほぼ1つになり、並列にしても速くならない（速くなるのは台数に余裕があり、担当者ごとに分かれる場合）
+・使っているのは multi_site.py（--workers）だけ。改定版.py はスクリプトの本体に if __name__ == '__main__' が無く、
+  spawn でワーカーを起動する環境（macOS・Windows）ではワーカーがスクリプト全体を実行し直してしまうので渡していない
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# これより装置数が少なければ並列にしない（プロセスの起動・データの受け渡しの方が時間がかかる）
+PARALLEL_THRESHOLD = 20_000
+
+
+def assign_months_parallel(persons, fixed_months, release_months, allocator, test_hours_needed=40, log=print,
+                           workers=None, threshold=None):
+    """
+    allocator.assign_months と同じ結果を、独立した成分ごとに並列に求める（allocator には予約を反映する）。
+    threshold: これより装置数が少なければ順に割り当てる（省略時は PARALLEL_THRESHOLD）
+    """
+    from allocator import _no_log, assign_months, placement_order
+
+    log = log or _no_log
+    workers = workers or os.cpu_count() or 1
+    threshold = PARALLEL_THRESHOLD if threshold is None else threshold
+    # 成分分けにも装置数分の処理がかかるので、並列にしない場合は先に判定する
+    if workers == 1 or len(persons) < threshold:
+        return assign_months(persons, fixed_months, release_months, allocator, test_hours_needed, log)
+    order = placement_order(fixed_months)
+    components = independent_components(persons, fixed_months, release_months, allocator, order)
+    if len(components) < 2:
+        return assign_months(persons, fixed_months, release_months, allocator, test_hours_needed, log)
+
+    shared = (allocator, list(persons), list(fixed_months), list(release_months), test_hours_needed)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+        results = list(pool.map(_run_batch, _batches(components, workers * 4)))
+
+    assigned = [None] * len(persons)
+    messages = []
+    for placed, logged in results:
+        for i, month in placed:
+            assigned[i] = month
+        messages.extend(logged)
+
+    # 予約はまとめて反映し（結果は順に予約した場合と同じ）、ログは1台ずつ割り当てた場合と同じ順で出す
+    placed = [i for i in range(len(persons)) if assigned[i] is not None]
+    allocator.ledger.subtract([persons[i] for i in placed], [assigned[i] for i in placed], test_hours_needed)
+    counts = np.bincount([allocator.month_pos[assigned[i]] for i in placed], minlength=len(allocator.months))
+    for month_index in np.flatnonzero(counts):
+        allocator.capacity.add(int(month_index), -int(counts[month_index]))
+    rank = {i: k for k, i in enumerate(order)}
+    for _, message in sorted(messages, key=lambda m: rank[m[0]]):
+        log(message)
+    return assigned
+
+
+def independent_components(persons, fixed_months, release_months, allocator, order=None):
+    """
+    互いに影響しない装置のまとまりを、装置の位置のリスト（それぞれ割り当ての順）のリストで返す（大きい順）。
+    order: 割り当ての順（省略時は位置の順）
+    """
+    n = len(persons)
+    n_months = len(allocator.months)
+    order = range(n) if order is None else order
+
+    fixed_index = np.array([allocator.month_pos.get(m, -1) if m is not None else -1 for m in fixed_months],
+                           dtype='int64')
+    is_fixed = np.array([m is not None for m in fixed_months], dtype=bool)
+    start_index = np.array([allocator._start_index(m) if m is not None else -1 for m in release_months],
+                           dtype='int64')
+    start_index[is_fixed] = -1
+
+    # 各月に入る可能性のある装置の数と、その月のテスト可能台数
+    demand = np.bincount(fixed_index[fixed_index >= 0], minlength=n_months)
+    demand = demand + np.cumsum(np.bincount(start_index[start_index >= 0], minlength=n_months))
+    capacity = np.array([allocator.capacity.get(i) for i in range(n_months)], dtype='float64')
+    binding = np.flatnonzero(demand > capacity)
+
+    coupled = np.zeros(n, dtype=bool)
+    if len(binding):
+        binding_month = np.zeros(n_months, dtype=bool)
+        binding_month[binding] = True
+        coupled |= (fixed_index >= 0) & binding_month[np.maximum(fixed_index, 0)]
+        coupled |= (start_index >= 0) & (start_index <= binding[-1])
+
+    # 担当者ごとにまとめ、満杯になり得る月に入る可能性のある装置の担当者は1つにまとめる
+    shared_group = object()
+    group_of = {persons[i]: shared_group for i in np.flatnonzero(coupled)}
+    groups = {}
+    for i in order:
+        groups.setdefault(group_of.get(persons[i], persons[i]), []).append(int(i))
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def _batches(components, n_batches):
+    # 大きい成分から順に、その時点で最も軽いまとまりに入れる（成分の中の順番は変えない）
+    batches = [[] for _ in range(min(n_batches, len(components)))]
+    sizes = [0] * len(batches)
+    for component in components:
+        k = sizes.index(min(sizes))
+        batches[k].append(component)
+        sizes[k] += len(component)
+    return batches
+
+
+_SHARED = None
+
+
+def _init_worker(shared):
+    global _SHARED
+    _SHARED = shared
+
+
+def _run_batch(components):
+    from allocator import place_device
+
+    allocator, persons, fixed_months, release_months, test_hours_needed = _SHARED
+    # まとまりの中の成分は担当者も満杯になり得る月も共有しないので、1つの複製で順に割り当ててよい
+    allocator = allocator.copy()
+    placed = []
+    logged = []
+    for component in components:
+        for i in component:
+            month = place_device(allocator, persons[i], fixed_months[i], release_months[i], test_hours_needed,
+                                 log=lambda message, i=i: logged.append((i, message)))
+            placed.append((i, month))
+    return placed, logged
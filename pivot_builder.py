@@ -0,0 +1,69 @@
+"""
+月 × 工程 のスケジュール表を1回の処理で作成する
+・各行を「範囲内の年月」「範囲外」「搬入日未定」「2026/4月以降」などの列（バケツ）に一括で振り分け
+・工程とバケツで安定ソートし、区切り位置ごとに機種名を改行でつなぐ
+・pivot_table + 範囲外/搬入日未定ごとのgroupby + reindex を置き換える
+"""
+
+import numpy as np
+import pandas as pd
+
+from date_utils import to_month
+
+OUT_OF_RANGE = '範囲外'
+UNDECIDED = '搬入日未定'
+AFTER_RANGE = '2026/4月以降'
+
+
+def build_schedule_pivot(df, date_column, start, end, undecided=None, extra_columns=(UNDECIDED, OUT_OF_RANGE),
+                         before_label=OUT_OF_RANGE, after_label=OUT_OF_RANGE,
+                         index_column='工程', value_column='機種名', row_order=None):
+    """
+    date_column の月で df を振り分け、行=工程・列=年月＋extra_columns の表を返す。
+    undecided: 搬入日未定の行を示すブール配列（日付が入っている行は日付を優先）
+    before_label / after_label: 範囲より前・後の行を入れる列名（extra_columns に無い列の行は表に出さない）
+    row_order: 工程の並び順（省略時は範囲内に1件以上ある工程を名前順）
+    """
+    months = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M')
+    month_labels = months.strftime('%Y-%m').tolist()
+    columns = month_labels + list(extra_columns)
+    column_pos = {c: i for i, c in enumerate(columns)}
+    n_months = len(month_labels)
+
+    # 各行のバケツ番号（-1は表に出さない）
+    month = to_month(df[date_column])
+    first = np.datetime64(months[0].strftime('%Y-%m'), 'M')
+    offset = (month - first).astype('int64')
+    has_date = ~np.isnat(month)
+    bucket = np.full(len(df), -1, dtype='int64')
+    in_range = has_date & (offset >= 0) & (offset < n_months)
+    bucket[in_range] = offset[in_range]
+    for label, mask in [(before_label, has_date & (offset < 0)), (after_label, has_date & (offset >= n_months))]:
+        if label in column_pos:
+            bucket[mask] = column_pos[label]
+    if undecided is not None and UNDECIDED in column_pos:
+        bucket[np.asarray(undecided, dtype=bool) & ~has_date] = column_pos[UNDECIDED]
+
+    process = df[index_column].to_numpy()
+    if row_order is None:
+        rows = sorted(pd.unique(process[in_range]))
+    else:
+        rows = list(row_order)
+    row_pos = pd.Index(rows)
+    row = row_pos.get_indexer(process)
+
+    keep = (bucket >= 0) & (row >= 0)
+    row, bucket = row[keep], bucket[keep]
+    values = df[value_column].to_numpy()[keep].astype(str)
+
+    # 工程→バケツの順に安定ソートし、同じセルの機種名を元の行順のまま改行でつなぐ
+    key = row * len(columns) + bucket
+    order = np.argsort(key, kind='stable')
+    key, values = key[order], values[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype='int64')
+    ends = np.r_[starts[1:], len(key)]
+
+    table = np.full((len(rows), len(columns)), '', dtype=object)
+    cells = key[starts]
+    table[cells // len(columns), cells % len(columns)] = ['\n'.join(values[a:b]) for a, b in zip(starts, ends)]
+    return pd.DataFrame(table, index=pd.Index(rows, name=index_column), columns=columns)
@@ -0,0 +1,152 @@
+"""
+処理段階ごとの計測（実行時間・入出力の行数・ピークメモリ）
+・スクリプトに --profile を付けたときだけ計測する。付けない場合は何もしないオブジェクトを返すので、計測のコストはほぼ無い
+・--profile-json パス を付けると、計測結果を JSON でも保存する
+・メモリは tracemalloc のピーク値（pandas / NumPy の確保分も含む）を段階ごとにリセットして測る
+
+使い方:
+    profiler = profiler_from_argv()
+    with profiler.stage('読み込み') as s:
+        df = pd.read_csv(path)
+        s.output(df)
+    profiler.report()
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+
+class StageProfiler:
+    """段階ごとの計測結果を records（dictのリスト）に貯める。"""
+
+    def __init__(self, enabled=True, json_path=None, trace_memory=True):
+        self.enabled = enabled
+        self.json_path = json_path
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def stage(self, name, rows_in=None):
+        """with で囲んだ処理を1段階として計測する。rows_in は入力の行数（DataFrameなどを渡してもよい）。"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows_in)
+
+    def summary(self):
+        """計測結果の表（文字列）。"""
+        if not self.records:
+            return "計測結果はありません。"
+        total = sum(r['seconds'] for r in self.records)
+        lines = [f"{'段階':<12}{'時間(秒)':>10}{'割合':>8}{'入力行数':>10}{'出力行数':>10}{'ピーク(MB)':>12}"]
+        for r in self.records:
+            share = r['seconds'] / total if total else 0
+            lines.append(
+                f"{r['stage']:<12}{r['seconds']:>10.3f}{share:>8.1%}"
+                f"{_blank(r['rows_in']):>10}{_blank(r['rows_out']):>10}{_blank(r['peak_mb'], '.1f'):>12}"
+            )
+        lines.append(f"{'合計':<12}{total:>10.3f}")
+        return '\n'.join(lines)
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.records}, f, ensure_ascii=False, indent=2)
+
+    def report(self):
+        """計測結果を表示し、json_path があれば保存する。計測していなければ何もしない。"""
+        if not self.enabled:
+            return
+        print(self.summary())
+        if self.json_path:
+            self.to_json(self.json_path)
+            print(f"計測結果が保存されました: {self.json_path}")
+
+
+class _Stage:
+    def __init__(self, profiler, name, rows_in):
+        self.profiler = profiler
+        self.name = name
+        self.rows_in = _count(rows_in)
+        self.rows_out = None
+
+    def output(self, result):
+        """出力の行数を記録する（DataFrame・リストなど len を持つものか行数）。"""
+        self.rows_out = _count(result)
+        return result
+
+    def __enter__(self):
+        self._tracing = self.profiler.trace_memory
+        if self._tracing:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        peak_mb = None
+        if self._tracing:
+            peak_mb = (tracemalloc.get_traced_memory()[1] - self._base) / 2 ** 20
+            if self._started_tracing:
+                tracemalloc.stop()
+        self.profiler.records.append({
+            'stage': self.name,
+            'seconds': seconds,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_mb': peak_mb,
+            'error': exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+class _NullStage:
+    # 計測しない場合の with 用オブジェクト（全て何もしない）
+    def output(self, result):
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def add_profile_arguments(parser):
+    """argparse を使うスクリプトに --profile / --profile-json を追加する。"""
+    parser.add_argument('--profile', action='store_true', help='処理段階ごとの時間・行数・メモリを計測して表示')
+    parser.add_argument('--profile-json', default=None, help='計測結果を保存する JSON ファイル（--profile を含む）')
+    return parser
+
+
+def profiler_from_args(args):
+    return StageProfiler(enabled=bool(args.profile or args.profile_json), json_path=args.profile_json)
+
+
+def profiler_from_argv(argv=None):
+    """引数を使わないスクリプト用。sys.argv の --profile / --profile-json だけを見る（他の引数は無視）。"""
+    parser = add_profile_arguments(argparse.ArgumentParser(add_help=False))
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return profiler_from_args(args)
+
+
+def _count(value):
+    if value is None:
+        return None
+    if hasattr(value, '__len__'):
+        return len(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _blank(value, spec='d'):
+    return '' if value is None else format(value, spec)
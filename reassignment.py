@@ -0,0 +1,165 @@
+"""
+資格表に基づく担当者の振り替え（担当者1人の時間不足で装置が割り当てられない・遅れるのを、チーム全体の時間で吸収する）
+・資格表は 担当者・エリア（・設備）の縦持ちの表。設備が空欄の行はそのエリアの全装置をテストできる
+・改定版.py と同じ手順（元の担当者）で割り当てた後、割り当てられなかった装置を割り当ての順に、
+  資格のある担当者の空いている月へ入れる。装置 → (担当者, 月) → 月 の二部グラフのマッチングを
+  増加路で広げるので、他の装置の月や担当者をずらせば入る場合も見つかる（optimal_schedule と同じ探索）
+・その後、リリース月より後にずれた装置を、資格のある担当者のより早い月に空きがあれば前倒しする
+・元の担当者で割り当てられた装置は外れない。担当者が変わった装置は 再割り当て 列に印を付け、
+  表では「(新しい担当者 ← 元の担当者)」と表示する
+
+使い方:
+    python reassignment.py 資格表.csv [管理表] [労働可能時間] [テスト可能台数] [--time-limit 10]
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from allocator import ScheduleBuffer, _month_labels_of, assign_months, month_labels, placement_order
+from devices import PROCESS_PRIORITY, _read_table, load_allocator, load_devices, prepare_devices
+from optimal_schedule import _Flow, _reserve, fill_unassigned
+from profiler import add_profile_arguments, profiler_from_args
+
+REASSIGNED = '〇'
+
+
+def load_qualifications(path, person_column='担当者', area_column='エリア'):
+    """資格表（担当者・エリア・設備（省略可）の列）を読み込む。"""
+    qualifications = _read_table(path)
+    missing = [c for c in (person_column, area_column) if c not in qualifications.columns]
+    if missing:
+        raise ValueError(f"資格表に列 {', '.join(missing)} がありません。")
+    return qualifications
+
+
+def qualified_candidates(devices, qualifications, person_column='オンラインテスト担当者', area_column='エリア',
+                         device_column='設備', qualified_person_column='担当者'):
+    """装置ごとの担当者の候補のリスト（先頭は元の担当者、残りは資格表の順）。"""
+    table = qualifications.rename(columns={qualified_person_column: '_候補'})
+    keys = pd.DataFrame({
+        '_位置': range(len(devices)),
+        area_column: devices[area_column].astype(object).to_numpy(),
+        '_設備': devices[device_column].astype(object).to_numpy() if device_column in devices.columns else None,
+    })
+    table = table.assign(**{area_column: table[area_column].astype(object)})
+    matched = keys.merge(table, on=area_column, how='inner', sort=False)
+    # 設備の指定がある行は、その設備の装置だけ
+    if device_column in table.columns:
+        restriction = matched[device_column]
+        matched = matched[restriction.isna() | (restriction.astype(str) == matched['_設備'].astype(str))]
+    others = matched.groupby('_位置', sort=False)['_候補'].agg(list).to_dict()
+
+    originals = devices[person_column].to_numpy()
+    return [[originals[i]] + [q for q in others.get(i, []) if q != originals[i]] for i in range(len(devices))]
+
+
+def reassign_devices(devices, allocator, qualifications, test_hours_needed=40, fixed_column='受け入れテスト実施日',
+                     release_column='リリース予定日', person_column='オンラインテスト担当者', time_limit=10.0,
+                     pull_forward=True, buffer=None):
+    """
+    devices（優先順位順）を資格のある担当者に振り替えながら割り当てる。allocator には最終的な割り当てを予約として反映する。
+    戻り値は devices に 元の担当者・元の割り当て月（改定版.py の割り当て）・割り当て月・再割り当て の列を加え、
+    person_column を新しい担当者にした表。
+    buffer（ScheduleBuffer）を渡すと、割り当てた装置を割り当ての順に、振り替えた担当者は「新 ← 元」の形で追加する。
+    """
+    started = time.perf_counter()
+    persons = devices[person_column].to_numpy()
+    release_months = _month_labels_of(devices[release_column])
+    if fixed_column is not None and fixed_column in devices.columns:
+        fixed_months = _month_labels_of(devices[fixed_column])
+    else:
+        fixed_months = [None] * len(devices)
+    candidates = qualified_candidates(devices, qualifications, person_column)
+
+    order = placement_order(fixed_months)
+    greedy = assign_months(persons, fixed_months, release_months, allocator.copy(), test_hours_needed, log=None)
+    flow = _Flow(persons, fixed_months, release_months, allocator, test_hours_needed, greedy, candidates)
+    fill_unassigned(flow, order, started + time_limit)
+    if pull_forward:
+        _pull_forward(flow, order)
+
+    assigned = flow.assigned()
+    new_persons = flow.assigned_persons()
+    _reserve(allocator, new_persons, assigned, test_hours_needed)
+
+    result = devices.copy()
+    result['元の担当者'] = persons
+    result[person_column] = [q if m is not None else p for p, q, m in zip(persons, new_persons, assigned)]
+    result['元の割り当て月'] = pd.Series(greedy, index=devices.index, dtype=object)
+    result['割り当て月'] = pd.Series(assigned, index=devices.index, dtype=object)
+    # 担当者が空欄のまま（NaN 同士）の装置は振り替えていない
+    new, original = result[person_column], result['元の担当者']
+    changed = ~(new.eq(original) | (new.isna() & original.isna()))
+    result['再割り当て'] = changed.map({True: REASSIGNED, False: ''})
+
+    if buffer is not None:
+        shown = result.iloc[order]
+        labels = shown[person_column].where(shown['再割り当て'] == '', shown[person_column] + ' ← ' + shown['元の担当者'])
+        buffer.add_devices(shown.assign(**{person_column: labels}), shown['割り当て月'])
+    return result
+
+
+def _pull_forward(flow, order):
+    # リリース月より後に入った装置を、資格のある担当者の空いているより早い月（元の担当者を優先）へ移す
+    for d in order:
+        current = flow.month_of[d]
+        if flow.fixed[d] or current <= flow.start[d]:
+            continue
+        moved = False
+        for m in range(flow.start[d], current):
+            for q in sorted(flow.candidates[d], key=lambda q: q != flow.person_of[d]):
+                if flow.slot_count[q, m] < flow.slot_cap[q, m] and flow.month_count[m] < flow.month_cap[m]:
+                    flow._move(d, q, m)
+                    moved = True
+                    break
+            if moved:
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description='資格表に基づいて担当者を振り替えながらテストスケジュールを作成する')
+    parser.add_argument('qualifications_path', help='資格表（担当者・エリア・設備（省略可）の列）')
+    parser.add_argument('equipment_schedule_path', nargs='?', default='装置アドレス、オンラインテスト管理表.csv')
+    parser.add_argument('available_hours_path', nargs='?', default='労働可能時間.csv')
+    parser.add_argument('monthly_capacity_path', nargs='?', default='月ごとのテスト可能台数.csv')
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2025-10-31')
+    parser.add_argument('--time-limit', type=float, default=10.0, help='振り替え先の探索の制限時間（秒）')
+    parser.add_argument('--no-pull-forward', action='store_true', help='遅れた装置の前倒しをしない')
+    parser.add_argument('--output', default='test_schedule5_reassigned.csv')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    with profiler.stage('読み込み') as s:
+        equipment_schedule, _ = load_devices(args.equipment_schedule_path)
+        qualifications = load_qualifications(args.qualifications_path)
+        months = month_labels(args.start, args.end)
+        allocator = load_allocator(args.available_hours_path, args.monthly_capacity_path, months)
+        s.output(equipment_schedule)
+    with profiler.stage('絞り込み・優先順位', rows_in=equipment_schedule) as s:
+        devices = s.output(prepare_devices(equipment_schedule))
+    with profiler.stage('割り当て（振り替え）', rows_in=devices) as s:
+        buffer = ScheduleBuffer()
+        result = reassign_devices(devices, allocator, qualifications, time_limit=args.time_limit,
+                                  pull_forward=not args.no_pull_forward, buffer=buffer)
+        s.output(result['割り当て月'].notna().sum())
+    with profiler.stage('出力', rows_in=len(buffer)):
+        buffer.render(months, PROCESS_PRIORITY.keys()).to_csv(args.output)
+        long_path = args.output.replace('.csv', '_long.csv') if args.output.endswith('.csv') else args.output + '_long.csv'
+        columns = ['エリア', '図面装置No', '設備', '元の担当者', 'オンラインテスト担当者', '元の割り当て月', '割り当て月',
+                   '再割り当て']
+        result[columns].to_csv(long_path, index=False, encoding='utf-8-sig')
+
+    before = int(result['元の割り当て月'].notna().sum())
+    after = int(result['割り当て月'].notna().sum())
+    reassigned = int((result['再割り当て'] == REASSIGNED).sum())
+    print(f"割り当て台数: {before} 台 → {after} 台（担当者を振り替えた装置: {reassigned} 台）")
+    print(f"スケジュールがCSVファイルに保存されました: {args.output}, {long_path}")
+    profiler.report()
+
+
+if __name__ == '__main__':
+    main()
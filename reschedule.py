@@ -0,0 +1,148 @@
+"""
+管理表の一部の行が変わったときの再割り当て（改定版.py の割り当てを最初からやり直さない）
+・割り当ては「確定月がある装置 → 残りの装置」を優先順位の順に1台ずつ置いていく処理なので、
+  変更された装置より前に置かれる装置の割り当てと、その時点の空き状況は変わらない
+・一定の台数ごとに割り当てエンジンの状態（台帳と月の台数）を保存しておき、並びが最初に変わる位置の直前から置き直す
+・並びが変わった範囲より後で、空き状況が前回の同じ位置と一致したらそれ以降の割り当ても前回と同じになるので、そこで打ち切る
+・結果は常に最初から割り当てた場合と同じになる
+"""
+
+import numpy as np
+import pandas as pd
+
+from allocator import _month_labels_of, place_device, placement_order
+from date_utils import normalize_dates
+from devices import DATE_COLUMNS, PROCESS_PRIORITY, prepare_devices
+
+
+class IncrementalScheduler:
+    """
+    equipment_schedule: 管理表（devices.load_devices の結果）
+    allocator: 割り当て前の CapacityAllocator（この中では変更しない）
+    checkpoint_every: 状態を保存する間隔（台数）。省略時は全体で128か所程度になるように決める
+    """
+
+    def __init__(self, equipment_schedule, allocator, test_hours_needed=40, process_priority=PROCESS_PRIORITY,
+                 fixed_column='受け入れテスト実施日', release_column='リリース予定日',
+                 person_column='オンラインテスト担当者', checkpoint_every=None):
+        self.equipment_schedule = equipment_schedule.copy()
+        self.base = allocator.copy()
+        self.test_hours_needed = test_hours_needed
+        self.process_priority = process_priority
+        self.fixed_column = fixed_column
+        self.release_column = release_column
+        self.person_column = person_column
+        self.checkpoint_every = checkpoint_every
+        # 直近の再割り当てで置き直した台数
+        self.replaced = 0
+        self.recompute()
+
+    @property
+    def assigned(self):
+        """devices.index に対応する割り当て月（割り当てられなければNone）。"""
+        months = [None] * len(self.sequence)
+        for position, i in enumerate(self.sequence):
+            months[i] = self.placed[position]
+        return pd.Series(months, index=self.devices.index, dtype=object)
+
+    def recompute(self):
+        """最初から割り当て直す。"""
+        self._prepare()
+        self.checkpoints = {}
+        self.placed = []
+        self._replay(0, self.base.copy(), None)
+        self.replaced = len(self.sequence)
+        return self.assigned
+
+    def update(self, index, **values):
+        """
+        管理表の1行（index）の列を書き換えて再割り当てする。
+        日付列は読み込み時と同じく normalize_dates で変換する（搬入日未定・読めない値は NaT）。
+        """
+        for column, value in values.items():
+            if column in DATE_COLUMNS:
+                result = normalize_dates(pd.Series([value], index=[index], dtype=object), name=column)
+                result.report()
+                value = result.dates.iloc[0]
+            series = self.equipment_schedule[column]
+            # カテゴリ型の列に新しい値を入れる場合はカテゴリを追加する
+            if isinstance(series.dtype, pd.CategoricalDtype) and not pd.isna(value) and value not in series.cat.categories:
+                self.equipment_schedule[column] = series.cat.add_categories([value])
+            self.equipment_schedule.at[index, column] = value
+        return self.refresh()
+
+    def refresh(self):
+        """equipment_schedule の変更を反映し、影響を受ける装置だけを置き直す。"""
+        old_keys = self.keys
+        old_checkpoints = self.checkpoints
+        old_placed = self.placed
+        self._prepare()
+
+        first, last = _changed_range(old_keys, self.keys)
+        if first is None:
+            self.replaced = 0
+            return self.assigned
+
+        # 変更位置の直前の保存状態から置き直す
+        step = self.step
+        start = (first // step) * step
+        while start > 0 and start not in old_checkpoints:
+            start -= step
+        if start not in old_checkpoints:
+            # 前回の装置が無かった場合など、置き直しの起点が無ければ最初から割り当てる
+            return self.recompute()
+        self.checkpoints = {p: a for p, a in old_checkpoints.items() if p <= start}
+        self.placed = old_placed[:start]
+        # 長さが同じなら、変更範囲より後で状態が前回と一致した位置以降は前回の結果を使える
+        same_length = len(old_keys) == len(self.keys)
+        reuse = (old_checkpoints, old_placed, self.allocator, last) if same_length else None
+        self.replaced = self._replay(start, old_checkpoints[start].copy(), reuse)
+        return self.assigned
+
+    def _prepare(self):
+        self.devices = prepare_devices(self.equipment_schedule, self.process_priority)
+        persons = self.devices[self.person_column].to_numpy()
+        releases = _month_labels_of(self.devices[self.release_column])
+        if self.fixed_column is not None and self.fixed_column in self.devices.columns:
+            fixed = _month_labels_of(self.devices[self.fixed_column])
+        else:
+            fixed = [None] * len(self.devices)
+        self.sequence = placement_order(fixed)
+        index = self.devices.index.to_numpy()
+        # 割り当ての順に並べた (装置, 担当者, 確定月, リリース月)。これが同じ位置までは結果も同じ
+        self.keys = [(index[i], persons[i], fixed[i], releases[i]) for i in self.sequence]
+        self.step = self.checkpoint_every or max(16, -(-len(self.keys) // 128))
+
+    def _replay(self, start, allocator, reuse):
+        for position in range(start, len(self.keys)):
+            if position % self.step == 0:
+                if reuse is not None:
+                    old_checkpoints, old_placed, old_allocator, last = reuse
+                    if position > last and _same_state(allocator, old_checkpoints[position]):
+                        self.checkpoints.update({p: a for p, a in old_checkpoints.items() if p >= position})
+                        self.placed.extend(old_placed[position:])
+                        self.allocator = old_allocator
+                        return position - start
+                self.checkpoints[position] = allocator.copy()
+            _, person, fixed, release = self.keys[position]
+            self.placed.append(place_device(allocator, person, fixed, release, self.test_hours_needed, log=None))
+        self.allocator = allocator
+        return len(self.keys) - start
+
+
+def _changed_range(old_keys, new_keys):
+    # 前回と並びが違う範囲 [first, last]（新しい並びでの位置）。同じなら (None, None)
+    n = min(len(old_keys), len(new_keys))
+    first = next((i for i in range(n) if old_keys[i] != new_keys[i]), n)
+    if first == n and len(old_keys) == len(new_keys):
+        return None, None
+    last = len(new_keys) - 1
+    k = 1
+    while k <= n - first and old_keys[-k] == new_keys[-k]:
+        last -= 1
+        k += 1
+    return first, max(last, first)
+
+
+def _same_state(a, b):
+    return a.capacity.tree == b.capacity.tree and np.array_equal(a.ledger.tree, b.ledger.tree)
@@ -0,0 +1,213 @@
+"""
+リリース予定日の遅れを考慮したモンテカルロシミュレーション
+・装置ごとにリリースの遅れ（月数）をサンプリングし、改定版.py と同じ割り当て（allocator.assign_months）をシナリオごとに実行
+・受け入れテスト実施日で確定している装置は遅れないので、確定分を反映した割り当てエンジンを1回だけ作って各シナリオで複製
+・シナリオはプロセスプールで分割実行し、入力はワーカー起動時に1回だけ渡して読み取り専用で使う
+・工程（エリア）ごと・担当者ごとの完了月をパーセンタイルで集計
+
+使い方:
+    python scenario.py 装置アドレス、オンラインテスト管理表.xlsx 労働可能時間.csv 月ごとのテスト可能台数.csv --scenarios 10000
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from allocator import assign_months, month_labels
+from profiler import add_profile_arguments, profiler_from_args
+
+# 期間内に割り当てられなかった場合の表示
+UNASSIGNED = '期間外'
+
+
+class PoissonSlip:
+    """リリースの遅れ（月数）をポアソン分布でサンプリングする。mean は装置ごとの配列でもよい。"""
+
+    def __init__(self, mean=1.0):
+        self.mean = mean
+
+    def __call__(self, rng, n_devices):
+        return rng.poisson(self.mean, n_devices)
+
+
+class EmpiricalSlip:
+    """過去の実績などから、遅れ（月数）とその確率を指定してサンプリングする。"""
+
+    def __init__(self, slips, probabilities):
+        self.slips = np.asarray(slips, dtype='int64')
+        self.probabilities = np.asarray(probabilities, dtype='float64') / np.sum(probabilities)
+
+    def __call__(self, rng, n_devices):
+        return rng.choice(self.slips, size=n_devices, p=self.probabilities)
+
+
+def run_scenarios(devices, allocator, n_scenarios=1000, slip_sampler=None, test_hours_needed=40, workers=None,
+                  seed=0, chunk_size=250):
+    """
+    devices: devices.prepare_devices の結果（最終優先順位の順）
+    allocator: 割り当て前の CapacityAllocator（この関数の中では変更しない）
+    戻り値: シナリオ × 装置 の割り当て月番号（allocator.months の位置、割り当てできなければ len(months)）
+    """
+    slip_sampler = slip_sampler or PoissonSlip()
+    shared = _prepare_shared(devices, allocator, slip_sampler, test_hours_needed)
+
+    # シナリオを分割し、分割ごとに独立した乱数列を使う（ワーカー数によらず同じ結果になる）
+    counts = [min(chunk_size, n_scenarios - start) for start in range(0, n_scenarios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    tasks = list(zip(seeds, counts))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        _init_worker(shared)
+        blocks = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            blocks = list(pool.map(_run_chunk, tasks))
+    if not blocks:
+        return np.zeros((0, len(devices)), dtype='int16')
+    return np.vstack(blocks)
+
+
+def completion_percentiles(devices, completion, months, percentiles=(50, 80, 95),
+                           group_columns=('エリア', 'オンラインテスト担当者')):
+    """
+    グループ（工程・担当者）ごとに、各シナリオで最後の装置がテストされる月を求め、そのパーセンタイルを返す。
+    行は (区分, 名前)、列は P50 などの月ラベルと、期間外になったシナリオの割合。
+    """
+    labels = list(months) + [UNASSIGNED]
+    frames = []
+    for column in group_columns:
+        codes, names = pd.factorize(devices[column].to_numpy())
+        # グループ内の装置の列を並べ、グループの区切りごとに最大値を取る
+        order = np.argsort(codes, kind='stable')
+        starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]]) if len(order) else []
+        finished = np.maximum.reduceat(completion[:, order], starts, axis=1) if len(order) else np.zeros((len(completion), 0))
+        result = {}
+        for q in percentiles:
+            month_index = np.percentile(finished, q, axis=0, method='higher').astype('int64')
+            result[f'P{q}'] = [labels[i] for i in month_index]
+        result['期間外の割合'] = (finished >= len(months)).mean(axis=0)
+        frame = pd.DataFrame(result, index=pd.MultiIndex.from_product([[column], names], names=['区分', '名前']))
+        frames.append(frame)
+    return pd.concat(frames)
+
+
+def _prepare_shared(devices, allocator, slip_sampler, test_hours_needed):
+    persons = devices['オンラインテスト担当者'].to_numpy()
+    months = allocator.months
+    first = np.datetime64(months[0], 'M')
+
+    fixed = pd.to_datetime(devices['受け入れテスト実施日']).to_numpy(dtype='datetime64[M]')
+    release = pd.to_datetime(devices['リリース予定日']).to_numpy(dtype='datetime64[M]')
+    fixed_labels = [None if np.isnat(m) else str(m) for m in fixed]
+    release_labels = [None if np.isnat(m) else str(m) for m in release]
+
+    # 確定分は遅れないので、先に割り当てたエンジンを共有する
+    base = allocator.copy()
+    fixed_assigned = assign_months(persons, fixed_labels, [None] * len(persons), base, test_hours_needed, log=None)
+    month_pos = {m: i for i, m in enumerate(months)}
+    fixed_index = np.array([month_pos[m] if m is not None else len(months) for m in fixed_assigned], dtype='int16')
+
+    remaining = np.flatnonzero(np.isnat(fixed))
+    release_index = (release - first).astype('int64')
+    return {
+        'allocator': base,
+        'months': months,
+        'persons': persons,
+        'priority': devices['最終優先順位'].to_numpy(dtype='float64'),
+        'release_index': release_index,
+        'has_release': ~np.isnat(release),
+        'remaining': remaining,
+        'fixed_index': fixed_index,
+        'slip_sampler': slip_sampler,
+        'test_hours_needed': test_hours_needed,
+    }
+
+
+_SHARED = None
+
+
+def _init_worker(shared):
+    global _SHARED
+    _SHARED = shared
+
+
+def _run_chunk(task):
+    seed, count = task
+    s = _SHARED
+    rng = np.random.default_rng(seed)
+    months = s['months']
+    n_months = len(months)
+    remaining = s['remaining']
+    persons = s['persons'][remaining]
+    priority = s['priority'][remaining]
+    has_release = s['has_release'][remaining]
+    release_index = s['release_index'][remaining]
+    # 元の並び（最終優先順位・リリース予定日の順）を同じ月の中での順番に使う
+    base_order = np.arange(len(remaining))
+
+    result = np.empty((count, len(s['persons'])), dtype='int16')
+    for k in range(count):
+        slip = np.maximum(s['slip_sampler'](rng, len(remaining)), 0)
+        start = release_index + slip
+        order = np.lexsort((base_order, start, priority))
+        allocator = s['allocator'].copy()
+        row = s['fixed_index'].copy()
+        for i in order:
+            if not has_release[i] or start[i] >= n_months:
+                row[remaining[i]] = n_months
+                continue
+            month = allocator.find_month(persons[i], months[max(start[i], 0)], s['test_hours_needed'])
+            if month is None:
+                row[remaining[i]] = n_months
+            else:
+                allocator.reserve(persons[i], month, s['test_hours_needed'])
+                row[remaining[i]] = allocator.month_pos[month]
+        result[k] = row
+    return result
+
+
+def main():
+    from devices import load_allocator, load_devices, prepare_devices
+
+    parser = argparse.ArgumentParser(description='リリース予定日の遅れを考慮したテスト完了月のシミュレーション')
+    parser.add_argument('equipment_schedule_path')
+    parser.add_argument('available_hours_path')
+    parser.add_argument('monthly_capacity_path')
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--mean-slip', type=float, default=1.0, help='リリースの平均遅れ（月）')
+    parser.add_argument('--start', default='2024-10-01')
+    parser.add_argument('--end', default='2025-10-31')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='scenario_percentiles.csv')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    with profiler.stage('読み込み') as s:
+        equipment_schedule, _ = load_devices(args.equipment_schedule_path)
+        months = month_labels(args.start, args.end)
+        allocator = load_allocator(args.available_hours_path, args.monthly_capacity_path, months)
+        s.output(equipment_schedule)
+    with profiler.stage('絞り込み・優先順位', rows_in=equipment_schedule) as s:
+        devices = s.output(prepare_devices(equipment_schedule))
+
+    with profiler.stage('シミュレーション', rows_in=devices) as s:
+        completion = s.output(run_scenarios(devices, allocator, n_scenarios=args.scenarios,
+                                            slip_sampler=PoissonSlip(args.mean_slip), workers=args.workers,
+                                            seed=args.seed))
+    with profiler.stage('集計', rows_in=completion) as s:
+        summary = s.output(completion_percentiles(devices, completion, months))
+    with profiler.stage('出力', rows_in=summary):
+        summary.to_csv(args.output, encoding='utf-8-sig')
+    print(summary)
+    print(f"シミュレーション結果がCSVファイルに保存されました: {args.output}")
+    profiler.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+"""
+改定版.py の割り当てを常駐させて問い合わせに答えるローカルのHTTPサービス
+・入力（管理表・労働可能時間・月ごとのテスト可能台数）と割り当て結果をメモリに持ち、問い合わせのたびに読み直さない
+・入力ファイルの更新（更新時刻とサイズ）を一定間隔で調べ、変わっていれば読み直す
+  管理表だけが変わった場合は reschedule.IncrementalScheduler で影響を受ける装置だけを置き直し、
+  労働可能時間・テスト可能台数が変わった場合は割り当てエンジンを作り直して最初から割り当てる
+・読み直しに失敗した場合（書き込み途中のファイルなど）は前の結果のまま答え、次の確認で再度読み直す
+
+使い方:
+    python schedule_service.py [--port 8765] [--interval 2]
+
+    GET  /status                         読み込んだ時刻・台数など
+    GET  /device?area=SubBE&no=123       装置の割り当て月
+    GET  /person?name=担当者[&month=2025-06]  担当者の月ごとの労働可能時間・割り当て時間・残り時間
+    GET  /month?month=2025-06            月の割り当て装置と残りのテスト可能台数
+    GET  /schedule                       エリア × 月の表（改定版.py の test_schedule5.csv と同じ形）
+    POST /reload                         入力を強制的に読み直す
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from allocator import ScheduleBuffer, month_labels
+from devices import PROCESS_PRIORITY, load_allocator, load_devices
+from reschedule import IncrementalScheduler
+
+# 改定版.py と同じ入力ファイルと対象期間
+EQUIPMENT_SCHEDULE_PATH = '装置アドレス、オンラインテスト管理表.csv'
+AVAILABLE_HOURS_PATH = '労働可能時間.csv'
+MONTHLY_CAPACITY_PATH = '月ごとのテスト可能台数.csv'
+START = '2024-10-01'
+END = '2025-10-31'
+
+
+class ScheduleService:
+    """
+    入力ファイルを読み込んで割り当てた結果をメモリに持ち、装置・担当者・月ごとの問い合わせに答える。
+    問い合わせと読み直しは別のスレッドから呼ばれてもよい（ロックで排他する）。
+    """
+
+    def __init__(self, equipment_schedule_path=EQUIPMENT_SCHEDULE_PATH, available_hours_path=AVAILABLE_HOURS_PATH,
+                 monthly_capacity_path=MONTHLY_CAPACITY_PATH, start=START, end=END, test_hours_needed=40,
+                 process_priority=PROCESS_PRIORITY, log=print):
+        self.paths = {'管理表': equipment_schedule_path, '労働可能時間': available_hours_path,
+                      'テスト可能台数': monthly_capacity_path}
+        self.months = month_labels(start, end)
+        self.test_hours_needed = test_hours_needed
+        self.process_priority = process_priority
+        self.log = log or (lambda message: None)
+        self.scheduler = None
+        self.loaded_at = None
+        self.last_error = None
+        self._stamps = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def reload(self, force=False):
+        """変わった入力ファイルを読み直して割り当てを更新する。読み直したファイルの種類のリストを返す。"""
+        with self._lock:
+            # 読み込み前の状態を覚えておき、読み込み中に書き換えられた場合は次の確認でもう一度読む
+            stamps = {name: _stamp(path) for name, path in self.paths.items()}
+            changed = [name for name in self.paths if force or stamps[name] != self._stamps.get(name)]
+            if not changed:
+                return []
+
+            equipment_schedule, _ = load_devices(self.paths['管理表'], areas=tuple(self.process_priority))
+            if self.scheduler is None or changed != ['管理表']:
+                allocator = load_allocator(self.paths['労働可能時間'], self.paths['テスト可能台数'], self.months)
+                self.scheduler = IncrementalScheduler(equipment_schedule, allocator, self.test_hours_needed,
+                                                      self.process_priority)
+            elif not self.scheduler.keys:
+                # 前回の割り当て対象が無ければ置き直しの起点が無いので、最初から割り当てる
+                self.scheduler.equipment_schedule = equipment_schedule.copy()
+                self.scheduler.recompute()
+            else:
+                self.scheduler.equipment_schedule = equipment_schedule.copy()
+                self.scheduler.refresh()
+
+            self._stamps = stamps
+            self.loaded_at = datetime.now()
+            self.last_error = None
+            self._build_index()
+            return changed
+
+    def check(self):
+        """入力ファイルの更新を確認して読み直す（失敗した場合は前の結果のままにする）。"""
+        try:
+            changed = self.reload()
+        except Exception as e:  # noqa: BLE001  書き込み途中のファイルなどは次の確認で読み直す
+            error = f"{type(e).__name__}: {e}"
+            # 同じ失敗は確認のたびに表示しない
+            if error != self.last_error:
+                self.log(f"入力の読み直しに失敗しました（前の結果を使います）: {error}")
+            self.last_error = error
+            return []
+        if changed:
+            self.log(f"{'・'.join(changed)} を読み直しました（置き直した装置: {self.scheduler.replaced} 台）")
+        return changed
+
+    def watch(self, interval=2.0):
+        """interval 秒ごとに入力ファイルの更新を確認するスレッドを開始する。"""
+        def loop():
+            while not self._stop.wait(interval):
+                self.check()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=loop, name='schedule-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def status(self):
+        with self._lock:
+            assigned = self._table['月'].notna()
+            return {
+                'loaded_at': self.loaded_at.isoformat(timespec='seconds') if self.loaded_at else None,
+                'files': self.paths,
+                'months': [self.months[0], self.months[-1]] if self.months else [],
+                'devices': len(self._table),
+                'assigned': int(assigned.sum()),
+                'unassigned': int((~assigned).sum()),
+                'replaced': self.scheduler.replaced,
+                'last_error': self.last_error,
+            }
+
+    def device(self, area, drawing_no):
+        """エリアと図面装置Noが一致する装置（複数あればすべて）と割り当て月。エリアは大文字・小文字を区別しない。"""
+        with self._lock:
+            rows = self._devices.get((_key(area).casefold(), _key(drawing_no)), [])
+            return [self._records[i] for i in rows]
+
+    def person(self, name, month=None):
+        """担当者の月ごとの労働可能時間・割り当て時間・残り時間と割り当て台数（month を指定するとその月だけ）。"""
+        with self._lock:
+            allocator = self.scheduler.allocator
+            if not allocator.has_person(name):
+                return None
+            months = [month] if month is not None else self.months
+            counts = self._person_counts.get(name, {})
+            result = []
+            for m in months:
+                if not allocator.has_month(m):
+                    continue
+                available = self.scheduler.base.available_hours(name, m)
+                remaining = allocator.available_hours(name, m)
+                result.append({'月': m, '労働可能時間': available, '割り当て時間': available - remaining,
+                               '残り時間': remaining, '台数': counts.get(m, 0)})
+            return result
+
+    def month(self, month):
+        """月に割り当てた装置（割り当てた順）と残りのテスト可能台数。"""
+        with self._lock:
+            allocator = self.scheduler.allocator
+            if not allocator.has_month(month):
+                return None
+            return {'月': month, '残りテスト可能台数': allocator.remaining_capacity(month),
+                    '装置': [self._records[i] for i in self._by_month.get(month, [])]}
+
+    def schedule(self):
+        """エリア × 月の表（改定版.py の出力と同じ）。"""
+        with self._lock:
+            devices = self.scheduler.devices
+            buffer = ScheduleBuffer()
+            order = self.scheduler.sequence
+            buffer.add_devices(devices.iloc[order], self.scheduler.assigned.iloc[order])
+            return buffer.render(self.months, self.process_priority.keys())
+
+    def _build_index(self):
+        # 問い合わせを辞書の参照だけで答えられるように、割り当てのたびに索引を作り直す
+        devices = self.scheduler.devices
+        table = pd.DataFrame({
+            'エリア': devices['エリア'].astype(object).to_numpy(),
+            '図面装置No': devices['図面装置No'].to_numpy(dtype=object),
+            '設備': devices['設備'].to_numpy(dtype=object),
+            'オンラインテスト担当者': devices['オンラインテスト担当者'].to_numpy(dtype=object),
+            '月': self.scheduler.assigned.to_numpy(dtype=object),
+        })
+        self._table = table
+        self._records = [{k: _plain(v) for k, v in row.items()} for row in table.to_dict('records')]
+
+        self._devices = {}
+        for i, (area, drawing_no) in enumerate(zip(table['エリア'], table['図面装置No'])):
+            self._devices.setdefault((_key(area).casefold(), _key(drawing_no)), []).append(i)
+
+        # 月ごとの装置は割り当てた順（確定月がある装置 → 残りの装置）
+        self._by_month = {}
+        self._person_counts = {}
+        months = table['月'].to_numpy()
+        persons = table['オンラインテスト担当者'].to_numpy()
+        for i in self.scheduler.sequence:
+            if months[i] is None:
+                continue
+            self._by_month.setdefault(months[i], []).append(i)
+            counts = self._person_counts.setdefault(persons[i], {})
+            counts[months[i]] = counts.get(months[i], 0) + 1
+
+
+def make_handler(service):
+    """service に問い合わせる HTTP リクエストハンドラのクラスを作る。"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path == '/status':
+                    self._json(service.status())
+                elif url.path == '/device':
+                    if 'area' not in query or 'no' not in query:
+                        return self._error(400, "area と no を指定してください。")
+                    found = service.device(query['area'], query['no'])
+                    self._json(found) if found else self._error(404, "該当する装置がありません。")
+                elif url.path == '/person':
+                    if 'name' not in query:
+                        return self._error(400, "name を指定してください。")
+                    found = service.person(query['name'], query.get('month'))
+                    self._json(found) if found is not None else self._error(404, "担当者のデータがありません。")
+                elif url.path == '/month':
+                    if 'month' not in query:
+                        return self._error(400, "month（YYYY-MM）を指定してください。")
+                    found = service.month(query['month'])
+                    self._json(found) if found is not None else self._error(404, "対象期間外の月です。")
+                elif url.path == '/schedule':
+                    self._send(200, service.schedule().to_csv().encode('utf-8-sig'), 'text/csv; charset=utf-8')
+                else:
+                    self._error(404, "不明なパスです。")
+            except Exception as e:  # noqa: BLE001
+                self._error(500, f"{type(e).__name__}: {e}")
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/reload':
+                return self._error(404, "不明なパスです。")
+            try:
+                self._json({'reloaded': service.reload(force=True), 'replaced': service.scheduler.replaced})
+            except Exception as e:  # noqa: BLE001
+                self._error(500, f"{type(e).__name__}: {e}")
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, value, code=200):
+            body = json.dumps(value, ensure_ascii=False, default=_plain).encode('utf-8')
+            self._send(code, body, 'application/json; charset=utf-8')
+
+        def _error(self, code, message):
+            self._json({'error': message}, code)
+
+        def _send(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(service, host='127.0.0.1', port=8765, interval=2.0):
+    """入力を読み込み、更新の確認を始めてから HTTP サービスを開始する（Ctrl+C で終了）。"""
+    started = time.perf_counter()
+    service.reload(force=True)
+    service.log(f"読み込みと割り当てが終わりました（{time.perf_counter() - started:.1f} 秒）")
+    if interval:
+        service.watch(interval)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    service.log(f"http://{host}:{server.server_address[1]}/ で待ち受けています")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def _stamp(path):
+    # 更新時刻とサイズ（ファイルが無ければ None）
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _key(value):
+    # 図面装置No は数値として読まれることがあるので、123.0 と '123' を同じにする
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _plain(value):
+    # JSON にできる値にする
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='割り当て結果を常駐させて問い合わせに答えるサービス')
+    parser.add_argument('--equipment', default=EQUIPMENT_SCHEDULE_PATH, help='管理表')
+    parser.add_argument('--hours', default=AVAILABLE_HOURS_PATH, help='労働可能時間')
+    parser.add_argument('--capacity', default=MONTHLY_CAPACITY_PATH, help='月ごとのテスト可能台数')
+    parser.add_argument('--start', default=START)
+    parser.add_argument('--end', default=END)
+    parser.add_argument('--test-hours', type=int, default=40, help='1台のテストに必要な時間')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=2.0, help='入力ファイルの更新を確認する間隔（秒、0で確認しない）')
+    args = parser.parse_args()
+
+    service = ScheduleService(args.equipment, args.hours, args.capacity, args.start, args.end, args.test_hours)
+    serve(service, args.host, args.port, args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+装置 × 月の状態コード（条件分岐.ini の IF 式の置き換え）
+・1: リリース日の月 ≦ 月 ≦ 初号機テスト可能日の月
+・2: subbe で初号機テスト可能日の月より後 / WP表・WP裏 で初号機テスト可能日の月より後かつ区切りの月より後
+・3: WP表・WP裏 で初号機テスト可能日の月より後かつ区切りの月（2025-12）以前
+・それ以外は空欄
+月は YEAR*12+MONTH と同じ月序数（datetime64[M]）にして、装置 × 月を1回のブロードキャストで判定する
+
+使い方:
+    python status_matrix.py ブック.xlsx --sheet Sheet1 --cutoff 2025-12 [--output 出力.xlsx]
+"""
+
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+BLANK = 0
+
+# 初号機テスト可能日の月より後は 2 にするエリア
+AFTER_READY_AREAS = ('subbe',)
+# 初号機テスト可能日の月より後は、区切りの月まで 3、その後は 2 にするエリア
+CUTOFF_AREAS = ('WP表', 'WP裏')
+
+# Excel では空欄の日付は YEAR=1900, MONTH=1 として比較される
+EXCEL_BLANK_MONTH = np.datetime64('1900-01', 'M')
+
+
+def status_codes(release, ready, areas, months, cutoff='2025-12', after_ready_areas=AFTER_READY_AREAS,
+                 cutoff_areas=CUTOFF_AREAS):
+    """
+    装置 × 月の状態コード（int8、空欄は 0）の配列を返す。
+    release / ready / areas: 装置ごとのリリース日・初号機テスト可能日・エリア
+    months: 列の月（日付や 'YYYY-MM' など）
+    エリアの比較は Excel と同じく大文字・小文字を区別しない。
+    """
+    release = _to_month(release)[:, None]
+    ready = _to_month(ready)[:, None]
+    month = _to_month(months)[None, :]
+    cutoff = np.datetime64(pd.Timestamp(cutoff), 'M')
+
+    area = pd.Series(np.asarray(areas, dtype=object)).astype('string').str.casefold()
+    after_ready_area = area.isin([a.casefold() for a in after_ready_areas]).to_numpy(dtype=bool)[:, None]
+    cutoff_area = area.isin([a.casefold() for a in cutoff_areas]).to_numpy(dtype=bool)[:, None]
+
+    after_ready = month > ready
+    conditions = [
+        (month >= release) & (month <= ready),
+        after_ready_area & after_ready,
+        cutoff_area & after_ready & (month <= cutoff),
+        cutoff_area & after_ready & (month >= cutoff),
+    ]
+    return np.select(conditions, [1, 2, 3, 2], BLANK).astype('int8')
+
+
+def status_matrix(df, months, release_column='リリース日', ready_column='初号機テスト可能日', area_column='エリア',
+                  **rules):
+    """df の行 × months の状態コードの表（空欄は ''）。rules は status_codes の cutoff などを指定する。"""
+    codes = status_codes(df[release_column], df[ready_column], df[area_column], months, **rules)
+    labels = pd.to_datetime(pd.Series(months)).dt.strftime('%Y-%m')
+    return pd.DataFrame(codes, index=df.index, columns=labels).astype(object).replace(BLANK, '')
+
+
+def write_status_matrix(workbook_path, sheet_name=None, output_path=None, header_row=1,
+                        release_column='リリース日', ready_column='初号機テスト可能日', area_column='エリア', **rules):
+    """
+    ブックのシートで、見出しが日付になっている列を月の列として状態コードを書き込む（IF 式を値で置き換える）。
+    装置の行は見出し行の次の行から。output_path を省略した場合は元のブックに上書きする。
+    """
+    from openpyxl import load_workbook
+
+    df = pd.read_excel(workbook_path, sheet_name=sheet_name or 0, header=header_row - 1)
+    month_positions = [i for i, c in enumerate(df.columns) if isinstance(c, (date, np.datetime64))]
+    if not month_positions:
+        raise ValueError("見出しが日付の列（月の列）が見つかりません。")
+    months = [df.columns[i] for i in month_positions]
+    codes = status_codes(df[release_column], df[ready_column], df[area_column], months, **rules)
+
+    workbook = load_workbook(workbook_path)
+    sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+    first_row = header_row + 1
+    for j, position in enumerate(month_positions):
+        column = position + 1
+        for i, code in enumerate(codes[:, j].tolist()):
+            # cell(value=None) では既存の式が消えないので、value に直接入れる
+            sheet.cell(row=first_row + i, column=column).value = code if code != BLANK else None
+    workbook.save(output_path or workbook_path)
+    return codes
+
+
+def _to_month(values):
+    months = pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[M]')
+    return np.where(np.isnat(months), EXCEL_BLANK_MONTH, months)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='装置 × 月の状態コードをブックに書き込む')
+    parser.add_argument('workbook_path')
+    parser.add_argument('--sheet', default=None)
+    parser.add_argument('--cutoff', default='2025-12', help='WP表・WP裏 を 3 から 2 に切り替える月')
+    parser.add_argument('--output', default=None, help='保存先（省略時は上書き）')
+    args = parser.parse_args()
+
+    codes = write_status_matrix(args.workbook_path, args.sheet, args.output, cutoff=args.cutoff)
+    print(f"状態コードを書き込みました: {codes.shape[0]} 行 × {codes.shape[1]} か月")
+
+
+if __name__ == '__main__':
+    main()
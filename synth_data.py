@@ -0,0 +1,134 @@
+"""
+ベンチマーク用の合成データ作成
+・装置搬入スケジュール2.csv / 装置アドレス、オンラインテスト管理表（csv か xlsx の「管理表」シート）/
+  労働可能時間.csv / 月ごとのテスト可能台数.csv を、各スクリプトと同じ列構成で作る
+・オンライン備考の「先行オンライン優先度：N位」、備考の「特別優先N位」、リリース予定日の「搬入日未定」も一定の割合で入れる
+
+使い方:
+    python synth_data.py 出力フォルダ --rows 100000 [--xlsx]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+AREAS = ['SubBE', 'EPI', 'WP表', 'WP裏', 'EDS']
+UNDECIDED = '搬入日未定'
+
+
+def make_inputs(n_rows, n_testers=50, start='2024-10-01', end='2026-03-31', undecided_rate=0.02, seed=0):
+    """
+    合成データを作成し、{名前: DataFrame} を返す。
+    キー: 装置搬入スケジュール / 管理表 / 労働可能時間 / 月ごとのテスト可能台数
+    """
+    rng = np.random.default_rng(seed)
+    months = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M')
+    month_labels = months.strftime('%Y-%m').tolist()
+    testers = np.array([f'担当者{i}' for i in range(1, n_testers + 1)], dtype=object)
+
+    # 日付（範囲の少し前後にもはみ出す）
+    day0 = pd.Timestamp(start) - pd.DateOffset(months=2)
+    span = (pd.Timestamp(end) + pd.DateOffset(months=2) - day0).days
+    release = day0 + pd.to_timedelta(rng.integers(0, span, n_rows), unit='D')
+    release_text = release.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    release_text[rng.random(n_rows) < undecided_rate] = UNDECIDED
+
+    dev_done = (release + pd.to_timedelta(rng.integers(-60, 90, n_rows), unit='D')).strftime('%Y-%m').to_numpy(dtype=object)
+    dev_done[rng.random(n_rows) < 0.3] = None
+    first_machine = (release + pd.to_timedelta(rng.integers(-90, 60, n_rows), unit='D')).strftime('%Y-%m').to_numpy(dtype=object)
+    first_machine[rng.random(n_rows) < 0.2] = None
+    accepted = (release + pd.to_timedelta(rng.integers(0, 45, n_rows), unit='D')).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    accepted[rng.random(n_rows) >= 0.1] = None
+
+    areas = rng.choice(AREAS, n_rows)
+    model_numbers = rng.integers(1, max(n_rows // 5, 2), n_rows)
+    models = np.char.add('装置', model_numbers.astype(str)).astype(object)
+    persons = rng.choice(testers, n_rows)
+
+    special = rng.integers(1, 4, n_rows).astype(str)
+    remarks = np.where(rng.random(n_rows) < 0.3, np.char.add(np.char.add('特別優先', special), '位'), None)
+    online_remarks = np.where(rng.random(n_rows) < 0.3, np.char.add(np.char.add('先行オンライン優先度：', special), '位'), None)
+
+    schedule = pd.DataFrame({
+        '機種名': models,
+        '工程': areas,
+        '備考': remarks,
+        'リリース予定日': release_text,
+        '仕様決め担当者': persons,
+        '開発テスト完了予定日': dev_done,
+        '初号機テスト実施時期': first_machine,
+        '増設機テスト実施時期': release_text,
+        '受入テスト実施日': accepted,
+    })
+
+    # 同じ機種名の中で号機を振る
+    unit = pd.Series(model_numbers).groupby(model_numbers).cumcount().to_numpy() + 1
+    management = pd.DataFrame({
+        'エリア': areas,
+        '図面装置No': np.arange(1, n_rows + 1),
+        '設備': models,
+        '号機': unit,
+        'オンライン対応': np.where(rng.random(n_rows) < 0.8, '〇', '×'),
+        'オンライン備考': online_remarks,
+        'リリース予定日': release_text,
+        '初号機テスト実施時期': first_machine,
+        '装置型式毎の初回テスト対象': np.where(unit == 1, '〇', '増設機'),
+        'オンラインテスト担当者': persons,
+        '受け入れテスト実施日': accepted,
+    })
+
+    hours = pd.DataFrame(rng.integers(40, 161, (n_testers, len(month_labels))), columns=month_labels)
+    hours.insert(0, '担当者', testers)
+
+    # 月ごとの台数は、対象装置がおおむね期間内に収まる程度
+    per_month = max(1, int(n_rows * 0.8 / len(month_labels)))
+    capacity = pd.DataFrame({'月': month_labels, 'テスト可能台数': rng.integers(per_month // 2 + 1, per_month + 2, len(month_labels))})
+
+    return {
+        '装置搬入スケジュール': schedule,
+        '管理表': management,
+        '労働可能時間': hours,
+        '月ごとのテスト可能台数': capacity,
+    }
+
+
+def write_inputs(output_dir, n_rows, xlsx=False, **kwargs):
+    """合成データをファイルに書き出し、{名前: パス} を返す。"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    frames = make_inputs(n_rows, **kwargs)
+    paths = {
+        '装置搬入スケジュール': output_dir / '装置搬入スケジュール2.csv',
+        '労働可能時間': output_dir / '労働可能時間.csv',
+        '月ごとのテスト可能台数': output_dir / '月ごとのテスト可能台数.csv',
+    }
+    frames['装置搬入スケジュール'].to_csv(paths['装置搬入スケジュール'], index=False)
+    frames['労働可能時間'].to_csv(paths['労働可能時間'], index=False)
+    frames['月ごとのテスト可能台数'].to_csv(paths['月ごとのテスト可能台数'], index=False)
+    if xlsx:
+        paths['管理表'] = output_dir / '装置アドレス、オンラインテスト管理表.xlsx'
+        frames['管理表'].to_excel(paths['管理表'], sheet_name='管理表', index=False)
+    else:
+        paths['管理表'] = output_dir / '装置アドレス、オンラインテスト管理表.csv'
+        frames['管理表'].to_csv(paths['管理表'], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ベンチマーク用の合成データを作成')
+    parser.add_argument('output_dir')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--testers', type=int, default=50)
+    parser.add_argument('--xlsx', action='store_true', help='管理表を xlsx で出力')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_inputs(args.output_dir, args.rows, xlsx=args.xlsx, n_testers=args.testers, seed=args.seed)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    main()
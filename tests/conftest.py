@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# スクリプトと同じく、リポジトリ直下のモジュールを読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from allocator import CapacityAllocator, month_labels
+from dependency_schedule import schedule_with_dependencies
+from devices import DEVICE_COLUMNS, prepare_devices
+
+MONTHS = month_labels('2024-10-01', '2025-03-31')
+
+
+def make_schedule(rows):
+    # rows: (設備, 号機, 装置型式毎の初回テスト対象)
+    return pd.DataFrame({
+        'エリア': 'SubBE',
+        '図面装置No': range(len(rows)),
+        '設備': [r[0] for r in rows],
+        '号機': [r[1] for r in rows],
+        'オンライン対応': '〇',
+        'オンライン備考': '',
+        'リリース予定日': pd.Timestamp('2024-10-01'),
+        '装置型式毎の初回テスト対象': [r[2] for r in rows],
+        'オンラインテスト担当者': 'A',
+        '受け入れテスト実施日': pd.NaT,
+    }, columns=DEVICE_COLUMNS)
+
+
+def make_allocator():
+    return CapacityAllocator(MONTHS, {'A': {m: 400 for m in MONTHS}}, {m: 10 for m in MONTHS})
+
+
+def test_units_follow_the_sheet_marking():
+    schedule = make_schedule([
+        ('X', 1, '〇'),
+        ('X', 2, '増設機'),
+        ('X', 3, ''),        # 印の無い装置は対象外
+        ('Y', 2, '増設機'),  # 初号機が対象に無い設備の増設機は初号機にしない
+    ])
+    devices = prepare_devices(schedule, first_only=False)
+    assert devices['図面装置No'].tolist() == [0, 1, 3]
+
+    logged = []
+    assigned = schedule_with_dependencies(devices, make_allocator(), lag=1, log=logged.append)
+    assert assigned.to_dict() == {0: '2024-10', 1: '2024-11', 3: None}
+    assert len(logged) == 1
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from allocator import CapacityAllocator, month_labels
+from reassignment import REASSIGNED, reassign_devices
+
+MONTHS = month_labels('2024-10-01', '2024-12-31')
+
+
+def make_allocator(hours):
+    return CapacityAllocator(MONTHS, {p: {m: h for m in MONTHS} for p, h in hours.items()}, {m: 5 for m in MONTHS})
+
+
+def make_devices(persons):
+    n = len(persons)
+    return pd.DataFrame({
+        'エリア': ['SubBE'] * n,
+        '図面装置No': range(n),
+        '設備': [f'設備{i}' for i in range(n)],
+        'オンラインテスト担当者': persons,
+        'リリース予定日': pd.to_datetime(['2024-10-01'] * n),
+        '受け入れテスト実施日': pd.NaT,
+    })
+
+
+def test_blank_person_left_unplaced_is_not_reassigned():
+    qualifications = pd.DataFrame({'担当者': ['A'], 'エリア': ['WP表']})
+    result = reassign_devices(make_devices([np.nan]), make_allocator({'A': 80}), qualifications)
+
+    assert result['割り当て月'].isna().all()
+    assert result['再割り当て'].tolist() == ['']
+
+
+def test_device_moved_to_qualified_person_is_marked():
+    qualifications = pd.DataFrame({'担当者': ['B'], 'エリア': ['SubBE']})
+    devices = make_devices(['A', 'A'])
+    result = reassign_devices(devices, make_allocator({'A': 40, 'B': 40}), qualifications)
+
+    assert result['割り当て月'].notna().all()
+    assert sorted(result['再割り当て']) == ['', REASSIGNED]
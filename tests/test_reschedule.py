@@ -0,0 +1,67 @@
+import threading
+
+import pandas as pd
+
+from allocator import CapacityAllocator, month_labels
+from devices import DEVICE_COLUMNS
+from reschedule import IncrementalScheduler
+
+MONTHS = month_labels('2024-10-01', '2025-03-31')
+
+
+def make_schedule(n):
+    return pd.DataFrame({
+        'エリア': ['SubBE', 'EPI', 'WP表'] * n,
+        '図面装置No': range(3 * n),
+        '設備': [f'設備{i}' for i in range(3 * n)],
+        '号機': 1,
+        'オンライン対応': '〇',
+        'オンライン備考': '',
+        'リリース予定日': pd.to_datetime(['2024-10-15', '2024-11-01', '2025-01-10'] * n),
+        '装置型式毎の初回テスト対象': '〇',
+        'オンラインテスト担当者': ['A', 'B', 'A'] * n,
+        '受け入れテスト実施日': pd.NaT,
+    }, columns=DEVICE_COLUMNS)
+
+
+def make_allocator():
+    hours = {p: {m: 80 for m in MONTHS} for p in ('A', 'B')}
+    return CapacityAllocator(MONTHS, hours, {m: 3 for m in MONTHS})
+
+
+def refresh_with_timeout(scheduler, timeout=10):
+    # 置き直しが終わらない場合にテストが止まらないよう、別スレッドで実行する
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(assigned=scheduler.refresh()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'refresh() が終わりません'
+    return result['assigned']
+
+
+def test_refresh_from_empty_plan():
+    scheduler = IncrementalScheduler(make_schedule(0), make_allocator())
+    assert scheduler.assigned.empty
+
+    scheduler.equipment_schedule = make_schedule(4)
+    assigned = refresh_with_timeout(scheduler)
+
+    expected = IncrementalScheduler(make_schedule(4), make_allocator()).assigned
+    pd.testing.assert_series_equal(assigned, expected)
+    assert assigned.notna().any()
+
+
+def test_update_accepts_undecided_release_date():
+    scheduler = IncrementalScheduler(make_schedule(4), make_allocator())
+    assigned = scheduler.update(0, リリース予定日='搬入日未定')
+
+    assert pd.isna(scheduler.equipment_schedule.at[0, 'リリース予定日'])
+    schedule = make_schedule(4)
+    schedule.loc[0, 'リリース予定日'] = pd.NaT
+    pd.testing.assert_series_equal(assigned, IncrementalScheduler(schedule, make_allocator()).assigned)
+
+
+def test_update_parses_date_strings():
+    scheduler = IncrementalScheduler(make_schedule(4), make_allocator())
+    scheduler.update(1, リリース予定日='2025/02/01')
+    assert scheduler.equipment_schedule.at[1, 'リリース予定日'] == pd.Timestamp('2025-02-01')
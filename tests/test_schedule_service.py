@@ -0,0 +1,72 @@
+import threading
+
+import pandas as pd
+
+from allocator import month_labels
+from devices import DEVICE_COLUMNS
+from schedule_service import ScheduleService
+
+START, END = '2024-10-01', '2025-03-31'
+
+
+def write_inputs(tmp_path, n_devices):
+    months = month_labels(START, END)
+    pd.DataFrame({'担当者': ['A', 'B'], **{m: [80, 80] for m in months}}).to_csv(tmp_path / 'hours.csv', index=False)
+    pd.DataFrame({'月': months, 'テスト可能台数': 3}).to_csv(tmp_path / 'capacity.csv', index=False)
+    write_schedule(tmp_path, n_devices)
+
+
+def write_schedule(tmp_path, n_devices):
+    pd.DataFrame({
+        'エリア': ['SubBE', 'EPI'] * n_devices,
+        '図面装置No': range(2 * n_devices),
+        '設備': [f'設備{i}' for i in range(2 * n_devices)],
+        '号機': 1,
+        'オンライン対応': '〇',
+        'オンライン備考': '',
+        'リリース予定日': ['2024-10-15', '搬入日未定'] * n_devices,
+        '装置型式毎の初回テスト対象': '〇',
+        'オンラインテスト担当者': ['A', 'B'] * n_devices,
+        '受け入れテスト実施日': '',
+    }, columns=DEVICE_COLUMNS).to_csv(tmp_path / 'schedule.csv', index=False)
+
+
+def make_service(tmp_path):
+    return ScheduleService(tmp_path / 'schedule.csv', tmp_path / 'hours.csv', tmp_path / 'capacity.csv',
+                           start=START, end=END, log=None)
+
+
+def call_with_timeout(function, timeout=10):
+    # 読み直しが終わらない場合にテストが止まらないよう、別スレッドで実行する
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), '読み直しが終わりません'
+    return result['value']
+
+
+def test_check_after_empty_schedule_becomes_non_empty(tmp_path):
+    write_inputs(tmp_path, 0)
+    service = make_service(tmp_path)
+    assert service.reload() == ['管理表', '労働可能時間', 'テスト可能台数']
+    assert service.status()['devices'] == 0
+
+    write_schedule(tmp_path, 3)
+    assert call_with_timeout(service.check) == ['管理表']
+    assert service.last_error is None
+
+    fresh = make_service(tmp_path)
+    fresh.reload()
+    assert service.status()['devices'] == fresh.status()['devices'] == 6
+    pd.testing.assert_frame_equal(service.schedule(), fresh.schedule())
+
+
+def test_reload_from_empty_schedule(tmp_path):
+    write_inputs(tmp_path, 0)
+    service = make_service(tmp_path)
+    service.reload()
+
+    write_schedule(tmp_path, 2)
+    assert call_with_timeout(service.reload) == ['管理表']
+    assert service.status()['assigned'] > 0
@@ -0,0 +1,152 @@
+"""
+スケジュールの表を xlsx に書き出す
+・シートごとに、元の表から1行ずつ取り出して書き出す。表全体の複製は作らないので、
+  書き出しに使うメモリは表の大きさやシートの数によらずほぼ一定
+  （xlsxwriter があれば constant_memory モード、無ければ openpyxl の write_only モード）
+・改行でつないだ機種名が見えるようにセルを折り返し表示にし、列幅は内容（全角は2文字分）から決める
+・工程の並び順（custom_order）を指定でき、複数の表を1つのブックの別シートに一度に書き出せる
+"""
+
+import unicodedata
+import warnings
+from datetime import datetime
+
+import pandas as pd
+
+# 列幅（文字数）の下限と上限
+MIN_WIDTH = 8
+MAX_WIDTH = 60
+# Excel の1セルの最大文字数
+MAX_CELL_LENGTH = 32767
+
+try:
+    import xlsxwriter  # noqa: F401
+    DEFAULT_ENGINE = 'xlsxwriter'
+except ImportError:
+    DEFAULT_ENGINE = 'openpyxl'
+
+
+def write_tables(output_path, sheets, row_order=None, wrap_text=True, freeze_header=True,
+                 min_width=MIN_WIDTH, max_width=MAX_WIDTH, engine=None):
+    """
+    sheets: {シート名: DataFrame}（build_schedule_pivot の結果など。行の見出しも1列目に書き出す）
+    row_order: 行の並び順（表に無い行は空行、指定に無い行は後ろに元の順で付ける）。省略時は表の順
+    engine: 'xlsxwriter' か 'openpyxl'（省略時は xlsxwriter があればそちら）
+    """
+    tables = _tables(sheets, row_order, min_width, max_width)
+    write = _write_xlsxwriter if (engine or DEFAULT_ENGINE) == 'xlsxwriter' else _write_openpyxl
+    write(output_path, tables, wrap_text, freeze_header)
+    return output_path
+
+
+def _tables(sheets, row_order, min_width, max_width):
+    # シートを書き出す直前に1つずつ、(シート名, 見出し, 行のイテレータ, 列幅) を作る
+    for sheet_name, table in sheets.items():
+        table = _ordered(table, row_order)
+        header = [table.index.name or ''] + [str(c) for c in table.columns]
+        columns = [table.index] + [table.iloc[:, j] for j in range(table.shape[1])]
+        widths = [_column_width(title, values, min_width, max_width) for title, values in zip(header, columns)]
+        yield sheet_name, header, table.itertuples(index=True, name=None), widths
+
+
+def _write_xlsxwriter(output_path, tables, wrap_text, freeze_header):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(str(output_path), {'constant_memory': True, 'strings_to_numbers': False,
+                                                      'strings_to_formulas': False, 'strings_to_urls': False})
+    cell_format = workbook.add_format({'text_wrap': wrap_text, 'valign': 'top'})
+    header_format = workbook.add_format({'text_wrap': wrap_text, 'valign': 'top', 'bold': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd', 'valign': 'top'})
+
+    for sheet_name, header, rows, widths in tables:
+        sheet = workbook.add_worksheet(sheet_name)
+        for i, width in enumerate(widths):
+            sheet.set_column(i, i, width)
+        if freeze_header:
+            sheet.freeze_panes(1, 1)
+        sheet.write_row(0, 0, header, header_format)
+        # constant_memory モードでは行の順に書く必要がある
+        for r, row in enumerate(rows, start=1):
+            for c, value in enumerate(row):
+                value = _value(value)
+                if value is None:
+                    continue
+                if isinstance(value, datetime):
+                    sheet.write_datetime(r, c, value, date_format)
+                else:
+                    sheet.write(r, c, value, cell_format)
+    workbook.close()
+
+
+def _write_openpyxl(output_path, tables, wrap_text, freeze_header):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    alignment = Alignment(wrap_text=wrap_text, vertical='top')
+    header_font = Font(bold=True)
+
+    for sheet_name, header, rows, widths in tables:
+        sheet = workbook.create_sheet(title=sheet_name)
+        # 列幅と見出しの固定は行を書く前に設定する
+        for i, width in enumerate(widths, start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = width
+        if freeze_header:
+            sheet.freeze_panes = 'B2'
+
+        sheet.append([_cell(sheet, value, alignment, header_font) for value in header])
+        for row in rows:
+            # 書式を付けるのは改行を含むセルだけ（それ以外はそのままの値の方が速い）
+            sheet.append([_cell(sheet, _value(value), alignment) if isinstance(value, str) and '\n' in value
+                          else _value(value) for value in row])
+
+    workbook.save(output_path)
+
+
+def _ordered(table, row_order):
+    if row_order is None:
+        return table
+    rows = list(row_order)
+    listed = set(rows)
+    rows += [r for r in table.index if r not in listed]
+    return table.reindex(rows).fillna('')
+
+
+def _cell(sheet, value, alignment, font=None):
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.alignment = alignment
+    if font is not None:
+        cell.font = font
+    return cell
+
+
+def _value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, str) and len(value) > MAX_CELL_LENGTH:
+        # Excel のセルの上限を超える分は切り捨てる（to_excel と同じ）
+        warnings.warn(f"セルの文字数 {len(value)} が上限を超えるため {MAX_CELL_LENGTH} 文字に切り詰めました。")
+        return value[:MAX_CELL_LENGTH]
+    return value
+
+
+def _column_width(title, values, min_width, max_width):
+    # 列で最も長い行（改行で区切った1行分）の表示幅。上限を超える分は数えない
+    longest = _display_width(title[:max_width])
+    for value in values:
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            continue
+        # 表示幅は文字数の2倍以下なので、文字数が今の最大の半分以下の行は調べない
+        limit = longest // 2
+        for line in str(value).split('\n'):
+            if len(line) > limit:
+                longest = max(longest, _display_width(line[:max_width]))
+                limit = longest // 2
+    return min(max(longest + 2, min_width), max_width)
+
+
+def _display_width(text):
+    return sum(2 if unicodedata.east_asian_width(ch) in ('F', 'W') else 1 for ch in text)
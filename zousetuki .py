@@ -1,19 +1,21 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from input_cache import read_schedule
 
 # ファイルパス
 equipment_schedule_path = r"装置アドレス、オンラインテスト管理表.csv"
 
-# データ読み込み
-equipment_schedule = pd.read_csv(equipment_schedule_path)
-
-# 必要な列を選択
-new_equipment_schedule = equipment_schedule[['エリア', '図面装置No', '設備', '号機', 'オンライン対応', 'オンライン備考', 'リリース予定日', '初号機テスト実施時期', '装置型式毎の初回テスト対象', 'オンラインテスト担当者', '受け入れテスト実施日']]
-
-# 有効なエリアのみをフィルタリング
+# 有効なエリアのみを読み込む（読み込みながら絞り込み、値の種類が少ない列はカテゴリ型）
 valid_areas = ['SubBE', 'EPI', 'WP表', 'WP裏', 'EDS']
-new_equipment_schedule = new_equipment_schedule[new_equipment_schedule['エリア'].isin(valid_areas)]
+
+# 必要な列だけを読み込み、日付列を正規化（'搬入日未定'は同時に分類）。前回と同じ内容のファイルならキャッシュを使う
+new_equipment_schedule, dates = read_schedule(
+    equipment_schedule_path,
+    columns=['エリア', '図面装置No', '設備', '号機', 'オンライン対応', 'オンライン備考', 'リリース予定日', '初号機テスト実施時期', '装置型式毎の初回テスト対象', 'オンラインテスト担当者', '受け入れテスト実施日'],
+    date_columns=['リリース予定日', '初号機テスト実施時期'],
+    filters={'エリア': valid_areas}, categories=['エリア', 'オンライン対応', '号機', '装置型式毎の初回テスト対象'],
+)
 
 # 新しい条件に基づいてデータをフィルタリング
 filtered_schedule = new_equipment_schedule[
@@ -21,17 +23,6 @@ filtered_schedule = new_equipment_schedule[
     (new_equipment_schedule['装置型式毎の初回テスト対象'] == '増設機')
 ]
 
-# 日付検証関数
-def validate_date(value):
-    try:
-        return pd.to_datetime(value)
-    except:
-        return pd.NaT
-
-# 'リリース予定日'と'初号機テスト実施時期'の補正
-filtered_schedule['リリース予定日'] = filtered_schedule['リリース予定日'].apply(validate_date)
-filtered_schedule['初号機テスト実施時期'] = filtered_schedule['初号機テスト実施時期'].apply(validate_date)
-
 # '初号機テスト実施時期'がNaTの場合、'リリース予定日'の月を代入
 filtered_schedule['初号機テスト実施時期'] = filtered_schedule.apply(
     lambda row: row['リリース予定日'] if pd.isna(row['初号機テスト実施時期']) else row['初号機テスト実施時期'],